@@ -0,0 +1,72 @@
+"""Wall time of a full run with --jobs 1 vs. --jobs 16 on a synthetic tree.
+
+Usage:
+    python benchmarks/bench_jobs.py [--files 50000] [--jobs 1 16]
+
+The tree is generated in a temporary directory. Run it on the filesystem you
+care about (e.g. TMPDIR on an NFS mount); on a warm local page cache the
+thread pool mostly measures decoding, not I/O latency.
+"""
+import argparse
+import filecmp
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from forgpt.core import FileCollector
+
+
+def make_tree(root, file_count, files_per_dir=100):
+    for i in range(file_count):
+        dir_path = os.path.join(root, f"pkg{i // files_per_dir:04d}")
+        if i % files_per_dir == 0:
+            os.makedirs(dir_path)
+        with open(os.path.join(dir_path, f"module{i}.py"), 'w', encoding='utf-8') as f:
+            f.write(f"# module {i}\n" + "def f():\n    return 'x'\n" * (i % 40 + 1))
+
+
+def timed_run(root, out_dir, jobs):
+    collector = FileCollector(root_dir=root, jobs=jobs)
+    collector.output_file = os.path.join(out_dir, f"allfiles.jobs{jobs}.txt")
+    # Start every run from an empty cache, or later runs get the earlier runs' sniff verdicts
+    shutil.rmtree(collector.cache_dir, ignore_errors=True)
+    start = time.perf_counter()
+    collector.run()
+    return time.perf_counter() - start, collector.output_file
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--files', type=int, default=50_000)
+    parser.add_argument('--jobs', type=int, nargs='+', default=[1, 16])
+    args = parser.parse_args()
+
+    work_dir = tempfile.mkdtemp(prefix="4gpt-bench-")
+    previous_cwd = os.getcwd()
+    try:
+        # The collector writes its cache relative to the working directory
+        os.chdir(work_dir)
+        root = os.path.join(work_dir, "tree")
+        os.makedirs(root)
+        make_tree(root, args.files)
+        outputs = []
+        for jobs in args.jobs:
+            elapsed, output = timed_run(root, work_dir, jobs)
+            outputs.append(output)
+            print(f"--jobs {jobs:<3} {elapsed:8.2f} s  {args.files / elapsed:10,.0f} files/s")
+        for other in outputs[1:]:
+            if not filecmp.cmp(outputs[0], other, shallow=False):
+                print(f"MISMATCH: {other} differs from {outputs[0]}")
+                sys.exit(1)
+        print("outputs are byte-identical")
+    finally:
+        os.chdir(previous_cwd)
+        shutil.rmtree(work_dir)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+"""Files matched per second: PatternMatcher vs. the per-pattern re.fullmatch loop.
+
+Usage:
+    python benchmarks/bench_matcher.py [--files N]
+"""
+import argparse
+import fnmatch
+import json
+import os
+import random
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from forgpt.core import PatternMatcher
+
+
+def load_default_patterns():
+    config_path = os.path.join(os.path.dirname(__file__), '..', 'forgpt', 'config.json')
+    with open(config_path, 'r') as f:
+        config = json.load(f)
+    include = set(config["include_patterns"])
+    exclude = set(config["exclude_patterns"]) | {config["output_file"], config["ignore_file"]}
+    # A few path-based patterns as used in real .gptignore files
+    exclude |= {"node_modules/*", "*/generated/*", "test_*"}
+    # Suffix globs that contain a "/" only match relative paths
+    exclude |= {"*/a.py", "*/package-lock.json", "*.d/conf"}
+    return include, exclude
+
+
+def synthetic_paths(count, seed=0):
+    rng = random.Random(seed)
+    extensions = [".py", ".js", ".ts", ".png", ".o", ".json", ".md", ".lock", ".svg", "", ".tar.gz", ".c"]
+    dirs = ["src", "lib", "node_modules/pkg", "docs", "src/generated", "tests", "vendor/x/y"]
+    paths = []
+    for i in range(count):
+        name = f"{rng.choice(['mod', 'test_', 'index', 'util'])}{i}{rng.choice(extensions)}"
+        paths.append((name, f"{rng.choice(dirs)}/{name}"))
+    for name in ["a.py", "package-lock.json", "conf"]:
+        for i in range(count // 100):
+            paths.append((name, f"{rng.choice(dirs)}/{rng.choice(['', 'x.d/', 'y/'])}{name}"))
+    return paths
+
+
+def legacy_compile(patterns):
+    """The per-pattern regexes the old dry run and tree walk used."""
+    compiled = []
+    for p in patterns:
+        if p == "*":
+            compiled.append(r"^.*$")
+        elif p == "*.*":
+            compiled.append(r"^.*\..*$")
+        else:
+            translated = fnmatch.translate(p)
+            if translated.startswith("(?s:") and translated.endswith("\\Z"):
+                regex_body = translated[4:-3]
+            elif translated.endswith("\\Z"):
+                regex_body = translated[:-2]
+            else:
+                regex_body = translated
+            compiled.append(f"^{regex_body}$")
+    return compiled
+
+
+def legacy_match(compiled_include, compiled_exclude, name, relative_path):
+    included = any(
+        re.fullmatch(pattern_re, name) or re.fullmatch(pattern_re, relative_path)
+        for pattern_re in compiled_include
+    )
+    excluded = any(
+        re.fullmatch(pattern_re, name) or re.fullmatch(pattern_re, relative_path)
+        for pattern_re in compiled_exclude
+    )
+    return included and not excluded
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--files', type=int, default=200_000)
+    args = parser.parse_args()
+
+    include, exclude = load_default_patterns()
+    paths = synthetic_paths(args.files)
+    print(f"{len(include)} include / {len(exclude)} exclude patterns, {len(paths)} paths")
+
+    compiled_include = legacy_compile(include)
+    compiled_exclude = legacy_compile(exclude)
+    start = time.perf_counter()
+    legacy = [legacy_match(compiled_include, compiled_exclude, n, r) for n, r in paths]
+    legacy_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    include_matcher = PatternMatcher(include)
+    exclude_matcher = PatternMatcher(exclude)
+    current = [include_matcher.matches(n, r) and not exclude_matcher.matches(n, r) for n, r in paths]
+    matcher_time = time.perf_counter() - start
+
+    if legacy != current:
+        mismatches = sum(1 for a, b in zip(legacy, current) if a != b)
+        print(f"MISMATCH: {mismatches} paths matched differently")
+        sys.exit(1)
+
+    print(f"legacy re.fullmatch loop: {len(paths) / legacy_time:12,.0f} files/s")
+    print(f"PatternMatcher:           {len(paths) / matcher_time:12,.0f} files/s")
+    print(f"speedup: {legacy_time / matcher_time:.1f}x ({sum(current)} files included)")
+
+
+if __name__ == "__main__":
+    main()
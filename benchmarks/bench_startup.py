@@ -0,0 +1,117 @@
+"""CLI startup cost: import time of forgpt (python -X importtime), wall time of a trivial command, matcher build.
+
+Usage:
+    python benchmarks/bench_startup.py [--runs 10] [--max-import-ms 30]
+
+Exits with status 1 if a module that should only be imported on demand is
+loaded by `4gpt list-includes`, or if the median import time exceeds
+--max-import-ms, so it can guard against startup regressions in CI.
+"""
+import argparse
+import os
+import re
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, REPO_ROOT)
+
+from forgpt.core import FileCollector, PatternMatcher
+
+# Needed only by some commands; importing them eagerly costs ~30 ms
+LAZY_MODULES = ["cProfile", "concurrent.futures", "gzip", "logging", "mmap", "platform", "shutil", "subprocess",
+                "forgpt.profiling", "forgpt.sinks", "forgpt.transforms"]
+
+IMPORTTIME_LINE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)")
+
+
+def run_python(args, cwd=None):
+    env = dict(os.environ, PYTHONPATH=REPO_ROOT)
+    return subprocess.run([sys.executable] + args, cwd=cwd, env=env, check=True,
+                          stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
+
+
+def import_time_ms():
+    """Cumulative import time of forgpt and everything it pulls in, in ms."""
+    result = run_python(["-X", "importtime", "-c", "import forgpt.core"])
+    total_us = 0
+    for line in result.stderr.splitlines():
+        match = IMPORTTIME_LINE.match(line)
+        # Top-level entries only; nested ones are part of their cumulative time
+        if match and len(match.group(3)) == 1 and match.group(4).startswith("forgpt"):
+            total_us += int(match.group(2))
+    return total_us / 1000
+
+
+def wall_time_ms(args, cwd):
+    start = time.perf_counter()
+    run_python(args, cwd=cwd)
+    return (time.perf_counter() - start) * 1000
+
+
+def eagerly_imported():
+    # argparse loads shutil for its help formatter; only count what forgpt adds
+    code = ("import argparse, sys; argparse.ArgumentParser().add_argument('-x'); before = set(sys.modules); "
+            "from forgpt.core import main; sys.argv[1:] = ['list-includes']; main(); print(*set(sys.modules) - before)")
+    result = run_python(["-c", code], cwd=tempfile.gettempdir())
+    loaded = set(result.stdout.split())
+    return [name for name in LAZY_MODULES if name in loaded]
+
+
+def matcher_build_ms(collector, runs=20):
+    """Time to build both matchers, with an empty re cache."""
+    include, exclude = collector.include_patterns, collector.exclude_patterns
+    times = []
+    for _ in range(runs):
+        re.purge()
+        start = time.perf_counter()
+        PatternMatcher(include), PatternMatcher(exclude)
+        times.append(time.perf_counter() - start)
+    return statistics.median(times) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--runs', type=int, default=10)
+    parser.add_argument('--max-import-ms', type=float,
+                        help='Fail if the median import time of forgpt.core is above this.')
+    args = parser.parse_args()
+
+    work_dir = tempfile.mkdtemp(prefix="4gpt-bench-")
+    try:
+        baseline = statistics.median(wall_time_ms(["-c", "pass"], work_dir) for _ in range(args.runs))
+        imports = statistics.median(import_time_ms() for _ in range(args.runs))
+        command = ["-c", "from forgpt.core import main; main()", "list-includes"]
+        list_includes = statistics.median(wall_time_ms(command, work_dir) for _ in range(args.runs))
+
+        print(f"python -c pass          {baseline:8.1f} ms")
+        print(f"import forgpt.core      {imports:8.1f} ms  (-X importtime, median of {args.runs})")
+        print(f"4gpt list-includes      {list_includes:8.1f} ms  ({list_includes - baseline:.1f} ms over bare interpreter)")
+
+        collector = FileCollector(root_dir=work_dir)
+        # A .gptignore with many path globs, where translating them starts to matter
+        collector.exclude_patterns |= {f"build_{i}/*.o{i}*" for i in range(300)}
+        build = matcher_build_ms(collector)
+        print(f"matchers, {len(collector.include_patterns) + len(collector.exclude_patterns)} patterns "
+              f"{build:6.2f} ms")
+
+        failed = False
+        eager = eagerly_imported()
+        if eager:
+            print(f"FAIL: imported at startup but should be lazy: {', '.join(eager)}")
+            failed = True
+        if args.max_import_ms is not None and imports > args.max_import_ms:
+            print(f"FAIL: import time {imports:.1f} ms exceeds {args.max_import_ms:.1f} ms")
+            failed = True
+        if failed:
+            sys.exit(1)
+    finally:
+        shutil.rmtree(work_dir)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,217 @@
+"""Files/s, MB/s and peak RSS of each phase and of full runs on synthetic trees, vs. a stored baseline.
+
+Usage:
+    python benchmarks/bench_suite.py [--shapes wide deep small huge excluded symlinks]
+                                     [--phases scan tree collect dry_run full]
+                                     [--scale 1.0] [--runs 3] [--jobs 1]
+                                     [--baseline benchmarks/baseline.json] [--save-baseline]
+                                     [--max-regression 25]
+
+The trees come from benchmarks/synthetic.py and are the same for the same
+--scale and --seed. Every measurement runs in a fresh interpreter, so peak RSS
+belongs to that phase alone, and with an empty .4gpt_cache. The page cache is
+warm after generating the tree, so this measures CPU cost, not disk latency.
+
+Phases:
+    scan     the directory walk and pattern matching (rescan())
+    tree     planning (sniffing, budget, dedup) and writing the tree section,
+             from an existing scan (generate_tree())
+    collect  writing the file blocks, from an existing plan (collect_files())
+    dry_run  dry_run(), output discarded
+    full     run(), as `4gpt` does
+
+The baseline is machine-specific and not checked in. Save one with
+--save-baseline on the commit you compare against; later runs print the change
+in time per phase and exit with status 1 if a phase got slower than
+--max-regression percent.
+"""
+import argparse
+import contextlib
+import json
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from forgpt.core import FileCollector
+from synthetic import SHAPE_OPTIONS, SHAPES, make_tree
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline.json")
+
+# phase -> (untimed preparation, timed step)
+PHASES = {
+    "scan": (None, lambda collector: collector.rescan()),
+    "tree": (lambda collector: collector._get_scan(), lambda collector: collector.generate_tree()),
+    "collect": (lambda collector: collector._get_plan(), lambda collector: collector.collect_files()),
+    "dry_run": (None, lambda collector: collector.dry_run()),
+    "full": (None, lambda collector: collector.run()),
+}
+
+
+def peak_rss_mb():
+    # ru_maxrss carries over the parent's peak across fork + exec on Linux;
+    # VmHWM starts from zero with the new process image.
+    try:
+        with open("/proc/self/status", 'r') as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) / 1e3
+    except OSError:
+        pass
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Kilobytes on Linux, bytes on macOS
+    return peak / 1e6 if sys.platform == "darwin" else peak / 1e3
+
+
+def measure(shape, phase, root, jobs):
+    """Runs one phase in this process and returns its measurement."""
+    options = SHAPE_OPTIONS.get(shape, {})
+    collector = FileCollector(root_dir=root, jobs=jobs, follow_symlinks=options.get("follow_symlinks", False))
+    collector.exclude_patterns |= set(options.get("exclude", ()))
+    collector.output_file = os.path.abspath("allfiles.txt")
+    prepare, step = PHASES[phase]
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        if prepare is not None:
+            prepare(collector)
+        start = time.perf_counter()
+        step(collector)
+        seconds = time.perf_counter() - start
+        rss = peak_rss_mb()
+        _, files = collector._get_plan()
+    return {"seconds": seconds, "files": len(files), "bytes": sum(item[1] for item in files), "peak_rss_mb": rss}
+
+
+def run_measurement(work_dir, shape, phase, root, jobs, timeout):
+    """Measures one phase in a child process, starting from an empty cache; None on timeout."""
+    shutil.rmtree(os.path.join(work_dir, ".4gpt_cache"), ignore_errors=True)
+    command = [sys.executable, os.path.abspath(__file__), "--measure", shape, phase, root, "--jobs", str(jobs)]
+    try:
+        result = subprocess.run(command, cwd=work_dir, check=True, stdout=subprocess.PIPE, text=True,
+                                timeout=timeout)
+    except subprocess.TimeoutExpired:
+        return None
+    return json.loads(result.stdout)
+
+
+def summarize(samples):
+    seconds = statistics.median(sample["seconds"] for sample in samples)
+    files = samples[0]["files"]
+    mb = samples[0]["bytes"] / 1e6
+    rss = [sample["peak_rss_mb"] for sample in samples if sample["peak_rss_mb"] is not None]
+    return {
+        "seconds": seconds,
+        "files": files,
+        "mb": mb,
+        "files_per_second": files / seconds if seconds else 0.0,
+        "mb_per_second": mb / seconds if seconds else 0.0,
+        "peak_rss_mb": max(rss) if rss else None,
+    }
+
+
+def load_baseline(path, scale):
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+    except FileNotFoundError:
+        print(f"No baseline at {path}; save one with --save-baseline.")
+        return None
+    if baseline.get("scale") != scale:
+        print(f"Baseline {path} was taken with --scale {baseline.get('scale')}; not comparing.")
+        return None
+    return baseline["results"]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--shapes', nargs='+', choices=list(SHAPES), default=list(SHAPES))
+    parser.add_argument('--phases', nargs='+', choices=list(PHASES), default=list(PHASES))
+    parser.add_argument('--scale', type=float, default=1.0, help='Multiplies the size of every tree.')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--runs', type=int, default=3, help='Measurements per phase; the median time is reported.')
+    parser.add_argument('--jobs', type=int, default=1)
+    parser.add_argument('--timeout', type=float, default=120,
+                        help='Seconds after which a measurement is stopped and reported as timed out.')
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE)
+    parser.add_argument('--save-baseline', action='store_true', help='Store these results as the new baseline.')
+    parser.add_argument('--max-regression', type=float,
+                        help='Fail if a phase takes this many percent longer than in the baseline.')
+    parser.add_argument('--measure', nargs=3, metavar=('SHAPE', 'PHASE', 'ROOT'), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.measure:
+        print(json.dumps(measure(*args.measure, args.jobs)))
+        return
+
+    baseline = None if args.save_baseline else load_baseline(args.baseline, args.scale)
+    results = {}
+    failures = []
+    work_dir = tempfile.mkdtemp(prefix="4gpt-bench-")
+    try:
+        print(f"{'shape':<9} {'phase':<8} {'files':>7} {'MB':>8} {'time':>9} {'files/s':>10} "
+              f"{'MB/s':>8} {'peak RSS':>9}  vs. baseline")
+        for shape in args.shapes:
+            root = os.path.join(work_dir, shape)
+            try:
+                make_tree(root, shape, args.scale, args.seed)
+            except OSError as e:  # e.g. no symlink permission on Windows
+                print(f"{shape:<9} skipped: {e}")
+                continue
+            for phase in args.phases:
+                samples = []
+                for _ in range(args.runs):
+                    sample = run_measurement(work_dir, shape, phase, root, args.jobs, args.timeout)
+                    if sample is None:
+                        break
+                    samples.append(sample)
+                if len(samples) < args.runs:
+                    print(f"{shape:<9} {phase:<8} timed out after {args.timeout:.0f} s")
+                    failures.append(f"{shape}/{phase} (timed out)")
+                    continue
+                result = results[f"{shape}/{phase}"] = summarize(samples)
+                rss = f"{result['peak_rss_mb']:7.1f}MB" if result["peak_rss_mb"] is not None else f"{'-':>9}"
+                comparison = ""
+                previous = baseline.get(f"{shape}/{phase}") if baseline else None
+                if previous:
+                    change = (result["seconds"] / previous["seconds"] - 1) * 100
+                    comparison = f"{change:+6.1f}% time"
+                    if args.max_regression is not None and change > args.max_regression:
+                        failures.append(f"{shape}/{phase} {change:+.1f}% vs. baseline")
+                        comparison += "  REGRESSION"
+                print(f"{shape:<9} {phase:<8} {result['files']:>7,} {result['mb']:>8.1f} "
+                      f"{result['seconds'] * 1000:>7.1f}ms {result['files_per_second']:>10,.0f} "
+                      f"{result['mb_per_second']:>8.1f} {rss}  {comparison}")
+            shutil.rmtree(root)
+    finally:
+        shutil.rmtree(work_dir)
+
+    if args.save_baseline:
+        baseline_data = {
+            "scale": args.scale,
+            "seed": args.seed,
+            "jobs": args.jobs,
+            "python": sys.version.split()[0],
+            "platform": sys.platform,
+            "results": results,
+        }
+        with open(args.baseline, 'w', encoding='utf-8') as f:
+            json.dump(baseline_data, f, indent=4)
+        print(f"Baseline written to {args.baseline}")
+    if failures:
+        print(f"FAIL: {', '.join(failures)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
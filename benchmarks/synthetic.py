@@ -0,0 +1,118 @@
+"""Reproducible synthetic source trees for the benchmarks.
+
+Each shape is a function (root, scale, rng) -> None that fills root. make_tree()
+seeds the generator, so the same shape, scale and seed always produce the same
+tree. SHAPE_OPTIONS holds the FileCollector settings a shape is meant to be
+run with (extra exclude patterns, following symlinks).
+"""
+import os
+import random
+
+# Included by the default config, and a share of files it skips
+SOURCE_EXTENSIONS = [".py", ".js", ".ts", ".md", ".json", ".c", ".h", ".go"]
+OTHER_EXTENSIONS = [".png", ".o", ".lock", ".bin"]
+
+LINE = "    value = compute(value, index)  # keep the line a typical length\n"
+
+
+def write_file(path, size, rng):
+    """Writes about size bytes of source-like text (exactly size for text files)."""
+    if os.path.splitext(path)[1] in (".png", ".o", ".bin"):
+        with open(path, 'wb') as f:
+            f.write(rng.randbytes(size))
+        return
+    header = f"# {os.path.basename(path)}\n"
+    body = (LINE * (size // len(LINE) + 1))[:max(0, size - len(header))]
+    with open(path, 'w', encoding='utf-8', newline='\n') as f:
+        f.write(header + body)
+
+
+def file_name(index, rng, other_share=0.1):
+    extensions = OTHER_EXTENSIONS if rng.random() < other_share else SOURCE_EXTENSIONS
+    return f"module_{index}{rng.choice(extensions)}"
+
+
+def wide(root, scale, rng):
+    """A few levels of directories with many files each."""
+    for d in range(int(20 * scale) or 1):
+        dir_path = os.path.join(root, f"pkg{d:03d}")
+        os.makedirs(dir_path)
+        for i in range(500):
+            write_file(os.path.join(dir_path, file_name(i, rng)), rng.randint(500, 4000), rng)
+
+
+def deep(root, scale, rng):
+    """Long chains of nested directories with a few files on every level."""
+    for chain in range(int(25 * scale) or 1):
+        dir_path = os.path.join(root, f"chain{chain:03d}")
+        for level in range(40):
+            dir_path = os.path.join(dir_path, f"level{level}")
+            os.makedirs(dir_path)
+            for i in range(5):
+                write_file(os.path.join(dir_path, file_name(i, rng)), rng.randint(500, 4000), rng)
+
+
+def small(root, scale, rng):
+    """Many tiny files, where per-file overhead dominates."""
+    count = int(20000 * scale) or 1
+    for i in range(count):
+        if i % 200 == 0:
+            dir_path = os.path.join(root, f"dir{i // 200:04d}")
+            os.makedirs(dir_path)
+        write_file(os.path.join(dir_path, file_name(i, rng)), rng.randint(50, 400), rng)
+
+
+def huge(root, scale, rng):
+    """A few large text files, where copying bytes dominates."""
+    for i in range(8):
+        write_file(os.path.join(root, f"dump_{i}.sql"), int(16 * 1024 * 1024 * scale) or 1, rng)
+
+
+def excluded(root, scale, rng):
+    """Most of the tree lives in excluded directories that must not be walked."""
+    for name, share in (("src", 1), ("node_modules", 6), ("build", 2), ("dist", 1)):
+        for d in range(int(share * 4 * scale) or 1):
+            dir_path = os.path.join(root, name, f"pkg{d:03d}", "lib")
+            os.makedirs(dir_path)
+            for i in range(250):
+                write_file(os.path.join(dir_path, file_name(i, rng)), rng.randint(500, 4000), rng)
+
+
+def symlinks(root, scale, rng):
+    """Directories with symlinks back to their ancestors (run with follow_symlinks)."""
+    for d in range(int(20 * scale) or 1):
+        dir_path = os.path.join(root, f"pkg{d:03d}", "inner")
+        os.makedirs(dir_path)
+        for i in range(200):
+            write_file(os.path.join(dir_path, file_name(i, rng)), rng.randint(500, 4000), rng)
+        os.symlink("..", os.path.join(dir_path, "parent"), target_is_directory=True)
+        os.symlink(os.path.join("..", ".."), os.path.join(dir_path, "top"), target_is_directory=True)
+        # A second path into the same files, which is not a loop
+        os.symlink("inner", os.path.join(root, f"pkg{d:03d}", "alias"), target_is_directory=True)
+
+
+SHAPES = {
+    "wide": wide,
+    "deep": deep,
+    "small": small,
+    "huge": huge,
+    "excluded": excluded,
+    "symlinks": symlinks,
+}
+
+SHAPE_OPTIONS = {
+    "excluded": {"exclude": ["node_modules", "build", "dist"]},
+    "symlinks": {"follow_symlinks": True},
+}
+
+
+def make_tree(root, shape, scale=1.0, seed=0):
+    """Creates root and fills it with the given shape; returns (files, bytes) written."""
+    os.makedirs(root)
+    SHAPES[shape](root, scale, random.Random(f"{shape}-{seed}"))
+    files = total_bytes = 0
+    for dir_path, _, names in os.walk(root):
+        for name in names:
+            files += 1
+            total_bytes += os.path.getsize(os.path.join(dir_path, name))
+    return files, total_bytes
@@ -1,3 +1,3 @@
 # twogpt/__init__.py
 
-from .core import main
+from .core import main, FileCollector, FileRecord
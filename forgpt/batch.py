@@ -0,0 +1,136 @@
+import contextlib
+import io
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from .core import FileCollector
+
+
+def read_roots(roots_file):
+    """Returns the root directories listed in roots_file ('-' for stdin), one per line.
+
+    Blank lines and lines starting with '#' are ignored. Relative roots are
+    resolved against the directory that contains roots_file.
+    """
+    if roots_file == "-":
+        lines = sys.stdin.read().splitlines()
+        base = os.getcwd()
+    else:
+        with open(roots_file, 'r', encoding='utf-8') as f:
+            lines = f.read().splitlines()
+        base = os.path.dirname(os.path.abspath(roots_file))
+    roots = []
+    for line in lines:
+        line = line.strip()
+        if line and not line.startswith("#"):
+            roots.append(os.path.normpath(os.path.join(base, os.path.expanduser(line))))
+    return roots
+
+
+def run_root(root, options):
+    """Runs one collector inside root, as `4gpt` started there would; returns a result dict.
+
+    Runs in a worker process. Output printed by the collector is captured and
+    only shown for failed roots.
+    """
+    result = {"root": root, "ok": False, "error": None, "outputs": [],
+              "files": 0, "bytes_read": 0, "bytes_written": 0, "seconds": 0.0, "messages": ""}
+    start = time.perf_counter()
+    previous_cwd = os.getcwd()
+    messages = io.StringIO()
+    try:
+        # The collector resolves .gptignore against root_dir, but writes its
+        # output and cache relative to the working directory.
+        os.chdir(root)
+        collector = FileCollector(root_dir=".", **options)
+        with contextlib.redirect_stdout(messages):
+            # run() reports write errors instead of raising them
+            written = collector.run()
+        if written:
+            _, files = collector._get_plan()
+            outputs = [os.path.abspath(path) for path in collector.output_paths]
+            result.update(ok=True, outputs=outputs, files=len(files), bytes_read=sum(item[1] for item in files),
+                          bytes_written=sum(os.path.getsize(path) for path in outputs))
+        else:
+            result["error"] = "output file was not written"
+    except Exception as e:
+        result["error"] = f"{type(e).__name__}: {e}"
+    finally:
+        os.chdir(previous_cwd)
+    result["seconds"] = time.perf_counter() - start
+    result["messages"] = messages.getvalue()
+    return result
+
+
+def run_batch(roots, workers=None, options=None, summary_json=None):
+    """Processes every root in a pool of worker processes and prints a summary.
+
+    options are passed on to FileCollector. Returns the number of failed roots.
+    """
+    options = options or {}
+    workers = max(1, workers or os.cpu_count() or 1)
+    start = time.perf_counter()
+    results = []
+
+    def report(result):
+        results.append(result)
+        status = "ok  " if result["ok"] else "FAIL"
+        detail = (f"{result['files']} files, {result['bytes_read'] / 1e6:.1f} MB"
+                  if result["ok"] else result["error"])
+        print(f"[{len(results)}/{len(roots)}] {status} {result['root']} ({detail}, {result['seconds']:.2f} s)")
+
+    if workers == 1 or len(roots) <= 1:
+        for root in roots:
+            report(run_root(root, options))
+    else:
+        with ProcessPoolExecutor(max_workers=min(workers, len(roots))) as pool:
+            futures = {pool.submit(run_root, root, options): root for root in roots}
+            for future in as_completed(futures):
+                try:
+                    report(future.result())
+                except Exception as e:  # e.g. a worker process died
+                    report({"root": futures[future], "ok": False, "error": f"{type(e).__name__}: {e}",
+                            "outputs": [], "files": 0, "bytes_read": 0, "bytes_written": 0,
+                            "seconds": 0.0, "messages": ""})
+
+    elapsed = time.perf_counter() - start
+    failed = [result for result in results if not result["ok"]]
+    files = sum(result["files"] for result in results)
+    bytes_read = sum(result["bytes_read"] for result in results)
+    bytes_written = sum(result["bytes_written"] for result in results)
+
+    print("\n--- Batch Summary ---")
+    print(f"Roots: {len(results) - len(failed)} ok, {len(failed)} failed, {workers} workers, {elapsed:.2f} s")
+    print(f"Files: {files:,} ({bytes_read / 1e6:,.1f} MB read, {bytes_written / 1e6:,.1f} MB written)")
+    if elapsed:
+        print(f"Throughput: {len(results) / elapsed:,.1f} roots/s, {files / elapsed:,.0f} files/s, "
+              f"{bytes_read / elapsed / 1e6:,.1f} MB/s read")
+    if failed:
+        print("Failures:")
+        for result in failed:
+            print(f"  {result['root']}: {result['error']}")
+            for line in result["messages"].splitlines():
+                print(f"      {line}")
+    print("--- End of Batch Summary ---")
+
+    if summary_json:
+        summary = {
+            "seconds": elapsed,
+            "workers": workers,
+            "roots_ok": len(results) - len(failed),
+            "roots_failed": len(failed),
+            "files": files,
+            "bytes_read": bytes_read,
+            "bytes_written": bytes_written,
+            "roots": sorted(results, key=lambda result: result["root"]),
+        }
+        try:
+            with open(summary_json, 'w', encoding='utf-8') as f:
+                json.dump(summary, f, indent=4)
+            print(f"Summary written to {summary_json}")
+        except OSError as e:
+            print(f"Error writing summary to {summary_json}: {e}")
+    return len(failed)
@@ -1,36 +1,66 @@
 import argparse
+import codecs
+import collections
+import hashlib
+import io
 import json
+import math
 import os
 import fnmatch
 import re
-from dir_tree import DirectoryTree
-import shutil
+import time
+import stat
 import sys
-import subprocess # NEU
-import platform   # NEU
+
+# Only needed by some commands and imported where they are used, to keep
+# startup fast: cProfile, concurrent.futures, platform, shutil,
+# subprocess and the profiling, sinks and transforms modules (see
+# benchmarks/bench_startup.py).
 
 # NEUE FUNKTION
 def copy_to_clipboard(text: str):
     """Copies the given text to the system clipboard."""
+    copy_stream_to_clipboard(io.BytesIO(text.encode('utf-8')))
+
+
+def copy_file_to_clipboard(path: str):
+    """Copies the contents of a UTF-8 file to the system clipboard without loading it into memory."""
+    try:
+        with open(path, 'rb') as f:
+            copy_stream_to_clipboard(f)
+    except OSError as e:
+        print(f"Error copying to clipboard: {e}")
+
+
+def _pipe_to(command, stream, **popen_kwargs):
+    import shutil
+    import subprocess
+    process = subprocess.Popen(command, stdin=subprocess.PIPE, **popen_kwargs)
+    try:
+        shutil.copyfileobj(stream, process.stdin)
+    finally:
+        process.stdin.close()
+        process.wait()
+
+
+def copy_stream_to_clipboard(stream):
+    """Pipes a binary stream of UTF-8 text into the system clipboard tool."""
+    import platform
     system = platform.system()
     try:
         if system == "Windows":
-            process = subprocess.Popen(['clip.exe'], stdin=subprocess.PIPE, close_fds=True)
-            process.communicate(input=text.encode('utf-8')) # oder 'mbcs'
+            _pipe_to(['clip.exe'], stream, close_fds=True) # oder 'mbcs'
             print("Content copied to clipboard (Windows).")
         elif system == "Darwin": # macOS
-            process = subprocess.Popen(['pbcopy'], stdin=subprocess.PIPE)
-            process.communicate(input=text.encode('utf-8'))
+            _pipe_to(['pbcopy'], stream)
             print("Content copied to clipboard (macOS).")
         elif system == "Linux":
             try:
-                process = subprocess.Popen(['xclip', '-selection', 'clipboard'], stdin=subprocess.PIPE)
-                process.communicate(input=text.encode('utf-8'))
+                _pipe_to(['xclip', '-selection', 'clipboard'], stream)
                 print("Content copied to clipboard (Linux with xclip).")
             except FileNotFoundError:
                 try:
-                    process = subprocess.Popen(['xsel', '--clipboard', '--input'], stdin=subprocess.PIPE)
-                    process.communicate(input=text.encode('utf-8'))
+                    _pipe_to(['xsel', '--clipboard', '--input'], stream)
                     print("Content copied to clipboard (Linux with xsel).")
                 except FileNotFoundError:
                     print("Clipboard tool (xclip or xsel) not found on Linux. Please install one to use this feature.")
@@ -40,17 +70,377 @@ def copy_to_clipboard(text: str):
         print(f"Error copying to clipboard: {e}")
 
 
+def print_file(path: str):
+    """Streams a UTF-8 file to stdout, replacing characters the console cannot encode."""
+    with open(path, 'rb') as f:
+        print_stream(f)
+
+
+def print_stream(stream, chunk_size=1024 * 1024):
+    """Streams binary UTF-8 content to stdout, replacing characters the console cannot encode."""
+    stdout_encoding = sys.stdout.encoding if sys.stdout.encoding else 'ascii'
+    sys.stdout.flush()
+    if codecs.lookup(stdout_encoding).name == 'utf-8' and hasattr(sys.stdout, 'buffer'):
+        import shutil
+        shutil.copyfileobj(stream, sys.stdout.buffer, chunk_size)
+        sys.stdout.buffer.flush()
+        sys.stdout.write("\n")
+        return
+    warned = False
+    text = io.TextIOWrapper(stream, encoding='utf-8', errors='replace')
+    for chunk in iter(lambda: text.read(chunk_size), ''):
+        try:
+            sys.stdout.write(chunk)
+        except UnicodeEncodeError:
+            if not warned:
+                print(f"\nWarning: Console encoding '{stdout_encoding}' cannot display all characters. Replacing unmappable characters.")
+                warned = True
+            sys.stdout.write(chunk.encode(stdout_encoding, errors='replace').decode(stdout_encoding))
+    text.detach()
+    sys.stdout.write("\n")
+
+
+class PatternMatcher:
+    """Matches names and relative paths against a set of glob patterns at once.
+
+    Suffix-only globs like "*.py" (without a "/") and literal names are
+    answered with set lookups; all remaining globs are compiled into a single
+    alternation regex.
+    """
+    def __init__(self, patterns):
+        self.patterns = set(patterns)
+        self._file_rules = self._compile(self._split(self.patterns))
+        # fnmatch.fnmatch() normalizes case for directory names, so keep a
+        # normcased copy of the rules for directory pruning.
+        self._dir_rules = self._compile(self._split({os.path.normcase(p) for p in self.patterns}))
+        self._explain_rules = None
+
+    @staticmethod
+    def _split(patterns):
+        match_all = False
+        literals = set()
+        extensions = set()
+        suffixes = []
+        globs = []
+        for p in sorted(patterns):
+            if p == "*":
+                match_all = True
+            elif not any(c in p for c in "*?["):
+                literals.add(p)
+            elif p.startswith("*") and not any(c in p[1:] for c in "*?[/"):
+                suffix = p[1:]
+                if suffix.startswith(".") and suffix.count(".") == 1:
+                    extensions.add(suffix)
+                else:
+                    suffixes.append(suffix)
+            else:
+                translated = fnmatch.translate(p)
+                if translated.endswith("\\Z"):
+                    translated = translated[:-2]
+                globs.append(f"(?:{translated})")
+        return [match_all, sorted(literals), sorted(extensions), suffixes, "|".join(globs) or None]
+
+    @staticmethod
+    def _compile(split):
+        match_all, literals, extensions, suffixes, regex = split
+        return match_all, set(literals), set(extensions), tuple(suffixes), re.compile(regex) if regex else None
+
+    @staticmethod
+    def _match_rules(rules, name, relative_path=None):
+        match_all, literals, extensions, suffixes, regex = rules
+        if match_all:
+            return True
+        # Suffix rules hold no "/" (see _split()), so they can only match the
+        # last path component: the name.
+        dot = name.rfind(".")
+        if dot >= 0 and name[dot:] in extensions:
+            return True
+        if suffixes and name.endswith(suffixes):
+            return True
+        if name in literals or (relative_path is not None and relative_path in literals):
+            return True
+        if regex is not None:
+            if regex.fullmatch(name):
+                return True
+            if relative_path is not None and regex.fullmatch(relative_path):
+                return True
+        return False
+
+    def matches(self, name, relative_path=None):
+        """True if any pattern matches the file name or its relative path."""
+        return self._match_rules(self._file_rules, name, relative_path)
+
+    def matches_dir(self, name):
+        """True if any pattern matches the directory name (fnmatch.fnmatch semantics)."""
+        return self._match_rules(self._dir_rules, os.path.normcase(name))
+
+    def explain(self, name, relative_path=None, is_dir=False):
+        """Returns the first pattern, in sorted order, that matches() (or matches_dir()) on its own.
+
+        None if no pattern matches. Meant for reporting; each pattern is tried
+        separately, so this is much slower than matches().
+        """
+        if self._explain_rules is None:
+            self._explain_rules = [
+                (p, self._compile(self._split({p})), self._compile(self._split({os.path.normcase(p)})))
+                for p in sorted(self.patterns)
+            ]
+        for pattern, file_rules, dir_rules in self._explain_rules:
+            if is_dir:
+                if self._match_rules(dir_rules, os.path.normcase(name)):
+                    return pattern
+            elif self._match_rules(file_rules, name, relative_path):
+                return pattern
+        return None
+
+
+class _IndexEntry:
+    """Stands in for os.DirEntry when the file list comes from the git index."""
+    __slots__ = ("name", "path", "children", "_stat")
+
+    def __init__(self, name, path, children=None):
+        self.name = name
+        self.path = path
+        self.children = children
+        self._stat = None
+
+    def is_dir(self):
+        return self.children is not None
+
+    def is_symlink(self):
+        return False
+
+    def is_file(self):
+        return self.children is None and stat.S_ISREG(self.stat().st_mode)
+
+    def stat(self):
+        if self._stat is None:
+            self._stat = os.stat(self.path)
+        return self._stat
+
+
+class ContentSniffer:
+    """Classifies files as "binary", "generated" or "minified" from their first few KB.
+
+    Verdicts are cached by (path, mtime_ns, size) in a JSON file, so files that
+    did not change are not opened again on later runs. None means plain text.
+    """
+    SNIFF_BYTES = 8192
+    MINIFIED_LINE = 1000
+    BINARY_RATIO = 0.3
+    GENERATED_RE = re.compile(rb"@generated|do not edit|code generated by|auto-?generated", re.IGNORECASE)
+    CONTROL_BYTES = bytes(b for b in range(32) if b not in b"\t\n\r\f\b")
+
+    def __init__(self, cache_path=None):
+        self.cache_path = cache_path
+        self._cache = {}
+        self._seen = {}
+        self._dirty = False
+        if cache_path is not None:
+            try:
+                with open(cache_path, 'r', encoding='utf-8') as f:
+                    self._cache = json.load(f)
+            except (OSError, ValueError):
+                pass
+
+    def verdict(self, file_path, size, mtime_ns):
+        key = os.path.normpath(file_path)
+        cached = self._cache.get(key)
+        if cached is not None and cached[0] == mtime_ns and cached[1] == size:
+            result = cached[2]
+        else:
+            result = self.sniff(file_path)
+            self._dirty = True
+        self._seen[key] = [mtime_ns, size, result]
+        return result
+
+    def cached_verdict(self, file_path, size, mtime_ns):
+        """Returns (found, verdict) from the cache alone; the file is never opened."""
+        cached = self._cache.get(os.path.normpath(file_path))
+        if cached is not None and cached[0] == mtime_ns and cached[1] == size:
+            return True, cached[2]
+        return False, None
+
+    def sniff(self, file_path):
+        try:
+            with open(file_path, 'rb') as f:
+                sample = f.read(self.SNIFF_BYTES)
+        except OSError:
+            return None
+        if not sample:
+            return None
+        if b"\0" in sample:
+            return "binary"
+        decoded = sample.decode('utf-8', errors='replace')
+        bad = decoded.count('\ufffd') + len(sample) - len(sample.translate(None, self.CONTROL_BYTES))
+        if bad / len(decoded) > self.BINARY_RATIO:
+            return "binary"
+        if self.GENERATED_RE.search(sample, 0, 1024):
+            return "generated"
+        lines = sample.split(b"\n")
+        if max(len(line) for line in lines) >= self.MINIFIED_LINE and len(sample) / len(lines) > 200:
+            return "minified"
+        return None
+
+    def save(self):
+        """Writes the verdicts of all files looked at in this run back to the cache."""
+        if self.cache_path is None or not (self._dirty or self._seen.keys() != self._cache.keys()):
+            return
+        try:
+            os.makedirs(os.path.dirname(self.cache_path) or ".", exist_ok=True)
+            with open(self.cache_path, 'w', encoding='utf-8') as f:
+                json.dump(self._seen, f, separators=(",", ":"))
+        except OSError as e:
+            print(f"Error writing sniff cache {self.cache_path}: {e}")
+
+
+class ByteTokenEstimator:
+    """Cheap token estimate: one token per bytes_per_token bytes of UTF-8.
+
+    Any object with the same two methods can be passed to FileCollector as
+    token_estimator, e.g. a wrapper around a real tokenizer. estimate_size()
+    is used to plan the budget from file sizes alone, before anything is read.
+    """
+    def __init__(self, bytes_per_token=4.0):
+        self.bytes_per_token = bytes_per_token
+
+    def count(self, text):
+        return self.estimate_size(len(text.encode('utf-8')))
+
+    def estimate_size(self, num_bytes):
+        return math.ceil(num_bytes / self.bytes_per_token)
+
+
+class FileRecord:
+    """One file of the output, as yielded by FileCollector.iter_files().
+
+    path, size and mtime_ns come from the scan. The output block (header,
+    content and footer as bytes) and the decoded content are read from disk
+    on first access only.
+    """
+    __slots__ = ("path", "size", "mtime_ns", "same_as", "_collector", "_block", "_hash", "_content")
+
+    def __init__(self, collector, path, size, mtime_ns, same_as=None):
+        self.path = path
+        self.size = size
+        self.mtime_ns = mtime_ns
+        # With dedup, the earlier file with identical content; the block is then a reference
+        self.same_as = same_as
+        self._collector = collector
+        self._block = None
+        self._hash = None
+        self._content = None
+
+    def __repr__(self):
+        return f"FileRecord({self.path!r}, size={self.size})"
+
+    @property
+    def mtime(self):
+        """Modification time in seconds, like os.stat().st_mtime."""
+        return self.mtime_ns / 1e9
+
+    @property
+    def block(self):
+        """The bytes this file contributes to the output file."""
+        return self.load()._block
+
+    @property
+    def content_hash(self):
+        """SHA-1 of the file bytes in the block, or None if the file could not be read."""
+        return self.load()._hash
+
+    @property
+    def estimated_bytes(self):
+        """Length of the block: exact once it is loaded, otherwise estimated from the file size."""
+        if self._block is None and self.same_as is None:
+            return self._collector._estimated_block_bytes((self.path, self.size, self.mtime_ns))
+        return len(self.block)
+
+    @property
+    def transform_context(self):
+        """State of the content transforms that shapes this block besides the file content, or None.
+
+        For example the file whose license header a repeated header points to.
+        """
+        return self._collector._transform_context(self.path)
+
+    @property
+    def content(self):
+        """The file text as it appears in the block, or None if the file cannot be read."""
+        if self._content is None:
+            self._content = self._collector._read_content(self.path)
+        return self._content
+
+    def load(self):
+        """Reads the block now (e.g. in a worker thread) and returns the record."""
+        if self._block is None:
+            if self.same_as is None:
+                self._block, self._hash = self._collector._read_block(self.path, self.size)
+            else:
+                self._block, self._hash = self._collector._reference_block(self.path, self.size)
+        return self
+
+    def write_to(self, out):
+        """Writes the block to the binary stream out and returns the content hash.
+
+        A block that was not loaded yet is streamed from disk without being
+        kept in memory.
+        """
+        if self._block is None and self.same_as is None:
+            return self._collector._timed_copy(out, self.path, self.size)
+        out.write(self.block)
+        return self._hash
+
+
 class FileCollector:
-    # ... (Die gesamte FileCollector Klasse bleibt exakt so, wie sie in deinem letzten Post war) ...
-    # (also init, reload_settings, load_global, load_local, save_local, save_global,
-    # add_include, remove_include, add_exclude, remove_exclude, list_includes, list_excludes,
-    # generate_tree, collect_files, _compile_patterns, _append_file_content, run, dry_run)
-    # Diese Methoden müssen nicht geändert werden.
-    def __init__(self, root_dir='.', use_global_config=False, permanent=False, follow_symlinks=False):
+    MANIFEST_VERSION = 1
+    # Upper bound for file blocks read ahead of the writer when jobs > 1
+    READ_AHEAD_BYTES = 64 * 1024 * 1024
+    # Files larger than this are never buffered whole; they are streamed by the writer
+    STREAM_THRESHOLD = 8 * 1024 * 1024
+    CHUNK_SIZE = 1024 * 1024
+    # Clean UTF-8 files from this size on are validated in chunks and copied by the kernel
+    ZERO_COPY_MIN = 64 * 1024
+    OMITTED_MARKER = " [omitted: token budget]"
+    # Smaller files are not worth a SAME AS reference
+    DEDUP_MIN_BYTES = 256
+    # Upper bound for remembered content digests (roughly 150 bytes each)
+    DEDUP_MAX_ENTRIES = 1_000_000
+    # Sort keys for --pack; ties keep walk order because sorted() is stable
+    PACK_POLICIES = {
+        "smallest": lambda item: item[1],
+        "depth": lambda item: (os.path.normpath(item[0]).count(os.sep), item[1]),
+        "recent": lambda item: -item[2],
+    }
+
+    def __init__(self, root_dir='.', use_global_config=False, permanent=False, follow_symlinks=False,
+                 incremental=False, jobs=1, max_tokens=None, pack_policy="smallest", token_estimator=None,
+                 use_git=False, git_untracked=False, dedup=False, sink=None):
         self.root_dir = root_dir
         self.use_global_config = use_global_config
         self.permanent = permanent # Relevant für das Erstellen einer lokalen .gptignore
         self.follow_symlinks = follow_symlinks
+        self.incremental = incremental
+        self.jobs = max(1, jobs)
+        self.use_git = use_git or git_untracked
+        self.git_untracked = git_untracked
+        self.max_tokens = max_tokens
+        self.pack_policy = pack_policy
+        self.token_estimator = token_estimator or ByteTokenEstimator()
+        self.dedup = dedup
+        self._sink = sink
+        self.output_paths = []
+        self.budget_summary = None
+        self.skipped_files = []
+        self._profile = None
+        self.scanned_dirs = []
+        self.scan_counts = {}
+        self._sniffer = None
+        self._scan_result = None
+        self._plan_result = None
+        self._scan_started_ns = 0
+        self._duplicates = {}
+        self._transform_cache = None
 
         if self.use_global_config:
             self.config = self.load_global_config()
@@ -68,9 +458,56 @@ class FileCollector:
         self.ignore_file = self.config.get("ignore_file", ".gptignore")
         self.include_patterns = set(self.config.get("include_patterns", []))
         self.exclude_patterns = set(self.config.get("exclude_patterns", []))
+        self.max_file_bytes = self.config.get("max_file_bytes")
+        self.skip_detected = set(self.config.get("skip_detected", ["binary"]))
+        self.cache_dir = self.config.get("cache_dir", ".4gpt_cache")
         self.exclude_patterns.add(self.output_file)
         self.exclude_patterns.add(self.ignore_file) 
+        self.exclude_patterns.add(self.cache_dir)
+        self.transforms = None
+        if self.config.get("transforms") or self.config.get("line_ranges"):
+            from .transforms import TransformPipeline
+            try:
+                self.transforms = TransformPipeline.from_config(self.config, self.root_dir)
+            except ValueError as e:
+                print(f"Error in transforms config: {e}")
+
+
+    @property
+    def sink(self):
+        """Where run() writes the output; a PlainTextSink unless another sink was given."""
+        if self._sink is None:
+            from .sinks import PlainTextSink
+            self._sink = PlainTextSink()
+        return self._sink
+
+    @sink.setter
+    def sink(self, sink):
+        self._sink = sink
+
+    @property
+    def profile(self):
+        """The RunProfile of this collector, or a NullProfile that records nothing."""
+        if self._profile is None:
+            from .profiling import NullProfile
+            self._profile = NullProfile()
+        return self._profile
+
+    @profile.setter
+    def profile(self, profile):
+        self._profile = profile
+
+    @property
+    def manifest_file(self):
+        """The manifest (block index) of output_file, written next to it."""
+        return self.output_file + ".manifest.json"
 
+    def _effective_exclude_patterns(self):
+        """exclude_patterns plus the files runs write, derived from the current output_file."""
+        base, ext = os.path.splitext(self.output_file)
+        # Manifest, compressed output, shards and the shard index of other sinks
+        return self.exclude_patterns | {self.output_file, self.manifest_file, self.output_file + ".*",
+                                        f"{base}.[0-9][0-9][0-9]{ext}*", f"{base}.index.json"}
 
     def local_config_exists(self):
         local_config_path = os.path.join(self.root_dir, '.gptignore')
@@ -100,6 +537,7 @@ class FileCollector:
                     json.dump(default_conf, f, indent=4)
                 return default_conf
             try:
+                import shutil
                 shutil.copy(global_config_path, local_config_path)
                 with open(local_config_path, 'r') as copied_file: 
                     return json.load(copied_file)
@@ -179,82 +617,566 @@ class FileCollector:
 
     def list_excludes(self):
         print("Currently excluded file patterns (from effective config):")
-        for pattern in sorted(list(self.exclude_patterns)):
+        for pattern in sorted(self._effective_exclude_patterns()):
             print(f"  {pattern}")
 
+    def _get_matchers(self):
+        """Returns the (include, exclude) PatternMatchers for the current patterns."""
+        return PatternMatcher(self.include_patterns), PatternMatcher(self._effective_exclude_patterns())
+
+    def scan(self, decisions=None):
+        """Walks root_dir once and returns (tree_lines, files, tree_index).
+
+        Tree lines and the list of included files are built from the same
+        os.scandir entries; files are (file_path, size, mtime_ns) tuples in
+        os.walk order and tree_index maps each included file_path to its line.
+        If decisions is a list, (path, relative_path, name, kind) is appended
+        for every file and every excluded directory, where kind is "included",
+        "excluded", "excluded_dir", "not_included" or "not_a_file".
+        """
+        include_matcher, exclude_matcher = self._get_matchers()
+        if self.profile.enabled:
+            from .profiling import TimedMatcher
+            include_matcher = TimedMatcher(include_matcher, self.profile, "scan.matching")
+            exclude_matcher = TimedMatcher(exclude_matcher, self.profile, "scan.matching")
+        dirs_visited = entries_seen = excluded = 0
+        self.scanned_dirs = []
+
+        root_name = os.path.basename(os.path.abspath(self.root_dir)) or os.path.abspath(self.root_dir)
+        tree_lines = [f"{root_name}/"]
+        files = []
+        tree_index = {}
+        try:
+            root_stat = os.stat(self.root_dir)
+            root_ancestors = frozenset([(root_stat.st_dev, root_stat.st_ino)])
+        except OSError:
+            root_ancestors = frozenset()
+
+        list_dir = self._list_dir
+        if self.use_git:
+            git_dirs = self._git_listing()
+            if git_dirs is not None:
+                list_dir = git_dirs.get
+
+        # Stack items are either finished tree lines or directories still to list.
+        # Children are pushed in reverse so they pop in sorted order.
+        stack = [("dir", self.root_dir, "", "", root_ancestors)]
+        while stack:
+            item = stack.pop()
+            if item[0] == "line":
+                if item[2] is not None:
+                    tree_index[item[2]] = len(tree_lines)
+                tree_lines.append(item[1])
+                continue
+            _, dir_path, rel_dir, prefix, ancestors = item
+            entries = list_dir(dir_path)
+            if entries is None:
+                continue
+            self.scanned_dirs.append(dir_path)
+            dirs_visited += 1
+            entries_seen += len(entries)
+
+            children = []
+            for entry in entries:
+                name = entry.name
+                relative_path = f"{rel_dir}{name}"
+                try:
+                    is_dir = entry.is_dir()
+                    is_symlink = entry.is_symlink()
+                except OSError:
+                    continue
+
+                if is_dir:
+                    if exclude_matcher.matches_dir(name):
+                        excluded += 1
+                        if decisions is not None:
+                            decisions.append((entry.path, f"{relative_path}/", name, "excluded_dir"))
+                        continue
+                    if is_symlink and not self.follow_symlinks:
+                        try:
+                            target = os.readlink(entry.path)
+                        except OSError:
+                            target = "?"
+                        children.append((f"{name} -> {target}", None, None))
+                        continue
+                    try:
+                        st = entry.stat()
+                        key = (st.st_dev, st.st_ino)
+                    except OSError:
+                        continue
+                    if key in ancestors:
+                        # Followed symlink points back up the tree
+                        children.append((f"{name}/ (symlink loop)", None, None))
+                        continue
+                    children.append((f"{name}/", (entry.path, f"{relative_path}/", ancestors | {key}), None))
+                    continue
+
+                # Match against BOTH filename and relative path
+                # This enables both "*.v" (filename) and "spartan6/ddr3.v" (path) patterns
+                if exclude_matcher.matches(name, relative_path):
+                    excluded += 1
+                    if decisions is not None:
+                        decisions.append((entry.path, relative_path, name, "excluded"))
+                    continue
+                try:
+                    st = entry.stat()
+                    file_size = st.st_size
+                except OSError:
+                    if not os.path.lexists(entry.path):
+                        # Gone, e.g. tracked by git but deleted from the work tree
+                        continue
+                    # Broken symlink: show it, but there is nothing to collect
+                    children.append((name, None, None))
+                    continue
+                matched = include_matcher.matches(name, relative_path)
+                included = matched and entry.is_file()
+                children.append((f"{name} ({self._format_size(file_size)})", None, entry.path if included else None))
+                if included:
+                    files.append((entry.path, file_size, st.st_mtime_ns))
+                if decisions is not None:
+                    kind = "included" if included else "not_a_file" if matched else "not_included"
+                    decisions.append((entry.path, relative_path, name, kind))
+
+            for index in range(len(children) - 1, -1, -1):
+                label, sub_dir, file_path = children[index]
+                last = index == len(children) - 1
+                if sub_dir is not None:
+                    sub_path, sub_rel, sub_ancestors = sub_dir
+                    stack.append(("dir", sub_path, sub_rel, prefix + ("    " if last else "│   "), sub_ancestors))
+                stack.append(("line", f"{prefix}{'└── ' if last else '├── '}{label}", file_path))
+
+        self.scan_counts = {
+            "dirs_visited": dirs_visited,
+            "entries_seen": entries_seen,
+            "entries_excluded": excluded,
+            "files_matched": len(files),
+        }
+        for name, value in self.scan_counts.items():
+            self.profile.add(name, value)
+        return tree_lines, files, tree_index
+
+    @staticmethod
+    def _list_dir(dir_path):
+        try:
+            with os.scandir(dir_path) as it:
+                return sorted(it, key=lambda e: e.name)
+        except OSError:
+            return None
+
+    def _git_listing(self):
+        """Lists files from the git index with one `git ls-files -z` call instead of walking.
+
+        Returns {dir_path: sorted entries} shaped like _list_dir() results, or
+        None if root_dir is not inside a git work tree.
+        """
+        command = ["git", "-C", self.root_dir, "ls-files", "-z", "--cached"]
+        if self.git_untracked:
+            command += ["--others", "--exclude-standard"]
+        import subprocess
+        try:
+            result = subprocess.run(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE, check=True)
+        except (OSError, subprocess.CalledProcessError) as e:
+            print(f"Cannot list files with git, falling back to a directory walk: {e}")
+            return None
+
+        dirs = {self.root_dir: {}}
+        for relative_path in result.stdout.decode('utf-8', errors='surrogateescape').split("\0"):
+            if not relative_path:
+                continue
+            dir_path = self.root_dir
+            parts = relative_path.split("/")
+            for part in parts[:-1]:
+                children = dirs[dir_path]
+                if part not in children:
+                    sub_path = os.path.join(dir_path, part)
+                    children[part] = _IndexEntry(part, sub_path, children=True)
+                    dirs[sub_path] = {}
+                dir_path = children[part].path
+            dirs[dir_path][parts[-1]] = _IndexEntry(parts[-1], os.path.join(dir_path, parts[-1]))
+        return {path: [children[name] for name in sorted(children)] for path, children in dirs.items()}
+
+    def _get_scan(self):
+        if self._scan_result is None:
+            # Files modified from here on may change again unnoticed within one mtime tick
+            self._scan_started_ns = time.time_ns()
+            self._scan_result = self.scan()
+        return self._scan_result
+
+    def _get_plan(self):
+        """Returns (tree_lines, files) after applying the token budget, if any."""
+        if self._plan_result is None:
+            tree_lines, files, tree_index = self._get_scan()
+            if self.skip_detected:
+                with self.profile.phase("sniff"):
+                    tree_lines, files = self._skip_detected_files(tree_lines, files, tree_index)
+                self.profile.add("files_skipped", len(self.skipped_files))
+            if self.max_tokens is not None:
+                with self.profile.phase("budget"):
+                    tree_lines, files = self._pack_budget(tree_lines, files, tree_index)
+                self.profile.add("files_omitted", self.budget_summary[1])
+            if self.dedup:
+                with self.profile.phase("dedup"):
+                    self._duplicates = self._find_duplicates(files)
+                self.profile.add("files_deduplicated", len(self._duplicates))
+            if self.transforms:
+                with self.profile.phase("transforms.prepare"):
+                    self.transforms.prepare(self, files)
+            self._plan_result = (tree_lines, files)
+        return self._plan_result
+
+    def _get_transform_cache(self):
+        if self._transform_cache is None:
+            from .transforms import TransformCache
+            self._transform_cache = TransformCache(os.path.join(self.cache_dir, "transformed"))
+        return self._transform_cache
+
+    def _transform_context(self, file_path):
+        return self.transforms.context(file_path) if self.transforms else None
+
+    def _get_sniffer(self):
+        if self._sniffer is None:
+            self._sniffer = ContentSniffer(os.path.join(self.cache_dir, "sniff.json"))
+        return self._sniffer
+
+    def _sniff_files(self, files):
+        """Returns the sniffer verdict for each (file_path, size, mtime_ns) item."""
+        sniffer = self._get_sniffer()
+        if self.jobs <= 1:
+            verdicts = [sniffer.verdict(*item) for item in files]
+        else:
+            from concurrent.futures import ThreadPoolExecutor
+            with ThreadPoolExecutor(max_workers=self.jobs) as pool:
+                verdicts = list(pool.map(lambda item: sniffer.verdict(*item), files))
+        sniffer.save()
+        return verdicts
+
+    def _skip_detected_files(self, tree_lines, files, tree_index):
+        """Drops files whose sniffed kind is listed in skip_detected and marks them in the tree."""
+        tree_lines = list(tree_lines)
+        kept = []
+        self.skipped_files = []
+        for item, verdict in zip(files, self._sniff_files(files)):
+            if verdict in self.skip_detected:
+                tree_lines[tree_index[item[0]]] += f" [skipped: {verdict}]"
+                self.skipped_files.append((item[0], verdict))
+            else:
+                kept.append(item)
+        return tree_lines, kept
+
+    def _find_duplicates(self, files):
+        """Maps each file whose content repeats an earlier file to (earlier path, content hash).
+
+        Only files that share their size with another file are hashed, and of
+        those only the ones that are new or changed since the current manifest
+        was written; for the others its content hash is used. At most
+        DEDUP_MAX_ENTRIES digests are remembered; once the table is full, new
+        contents are no longer recorded, so memory stays bounded on huge trees.
+        """
+        sizes = collections.Counter(item[1] for item in files)
+        candidates = [item for item in files if item[1] >= self.DEDUP_MIN_BYTES and sizes[item[1]] > 1]
+        previous = self.load_index() if candidates else None
+        previous_files = previous["files"] if previous else {}
+        # Same rule as run_incremental(): files modified after the scan started are never trusted
+        trusted_before_ns = previous["scan_started_ns"] if previous else 0
+        previous_limit = previous["settings"].get("max_file_bytes") if previous else None
+
+        def digest_of(item):
+            file_path, file_size, mtime_ns = item
+            old = previous_files.get(os.path.normpath(file_path))
+            # The manifest hashes the bytes in the block, which are the whole file unless it was cut off
+            if (old is not None and old.get("hash") and old["size"] == file_size and old["mtime_ns"] == mtime_ns
+                    and mtime_ns < trusted_before_ns and (previous_limit is None or file_size <= previous_limit)):
+                return bytes.fromhex(old["hash"])
+            return self._content_digest(file_path)
+
+        if self.jobs <= 1:
+            digests = map(digest_of, candidates)
+        else:
+            from concurrent.futures import ThreadPoolExecutor
+            with ThreadPoolExecutor(max_workers=self.jobs) as pool:
+                digests = list(pool.map(digest_of, candidates))
+        seen = {}
+        duplicates = {}
+        for (file_path, _, _), digest in zip(candidates, digests):
+            if digest is None:
+                continue
+            original = seen.get(digest)
+            if original is not None:
+                duplicates[file_path] = (original, digest.hex())
+            elif len(seen) < self.DEDUP_MAX_ENTRIES:
+                seen[digest] = file_path
+        return duplicates
+
+    def _content_digest(self, file_path):
+        """SHA-1 of the whole file (the same hash _copy_file_block() returns), or None."""
+        hasher = hashlib.sha1()
+        try:
+            with open(file_path, 'rb') as f:
+                for chunk in iter(lambda: f.read(self.CHUNK_SIZE), b""):
+                    hasher.update(chunk)
+        except OSError:
+            return None
+        return hasher.digest()
+
+    def _estimated_block_bytes(self, item):
+        file_path, file_size, _ = item
+        if self.max_file_bytes is not None:
+            file_size = min(file_size, self.max_file_bytes)
+        # START/END header lines around the content
+        return file_size + 2 * len(os.path.normpath(file_path).encode('utf-8')) + 60
+
+    def _pack_budget(self, tree_lines, files, tree_index):
+        """Picks files by pack_policy until max_tokens is used up; nothing is read here."""
+        estimator = self.token_estimator
+        costs = {item[0]: estimator.estimate_size(self._estimated_block_bytes(item)) for item in files}
+        used = estimator.count(self._tree_text(tree_lines))
+        selected = []
+        for item in sorted(files, key=self.PACK_POLICIES[self.pack_policy]):
+            if used + costs[item[0]] <= self.max_tokens:
+                selected.append(item[0])
+                used += costs[item[0]]
+
+        # Omitted files are marked in the tree, which costs tokens as well;
+        # give up the lowest-priority picks until the marked tree fits too.
+        marker_cost = estimator.count(self.OMITTED_MARKER)
+        used += marker_cost * (len(files) - len(selected))
+        while selected and used > self.max_tokens:
+            used -= costs[selected.pop()] - marker_cost
+
+        selected = set(selected)
+        tree_lines = list(tree_lines)
+        for file_path, _, _ in files:
+            if file_path not in selected:
+                tree_lines[tree_index[file_path]] += self.OMITTED_MARKER
+        self.budget_summary = (used, len(files) - len(selected))
+        return tree_lines, [item for item in files if item[0] in selected]
+
+    def _tree_text(self, tree_lines):
+        return "File Structure:\n" + "\n".join(tree_lines) + "\n\n"
+
+    def rescan(self):
+        """Walks the tree again; tree_text() and iter_files() use the new result."""
+        self._scan_result = None
+        self._plan_result = None
+        with self.profile.phase("scan"):
+            self._get_scan()
+
+    def tree_text(self):
+        """Returns the "File Structure:" section of the output."""
+        tree_lines, _ = self._get_plan()
+        return self._tree_text(tree_lines)
+
+    def iter_files(self):
+        """Yields a FileRecord for each file of the output, in output order.
+
+        Nothing is read until a record's block or content is used. The first
+        call scans the tree; call rescan() to pick up later changes on disk.
+        """
+        _, files = self._get_plan()
+        for item in files:
+            yield self._record(item)
+
+    def _record(self, item):
+        duplicate = self._duplicates.get(item[0])
+        return FileRecord(self, *item, same_as=duplicate[0] if duplicate else None)
+
+    def iter_blocks(self):
+        """Yields the output as bytes: the tree section, then one block per file.
+
+        b"".join(collector.iter_blocks()) is what run() writes to output_file.
+        With jobs > 1 the blocks are read ahead in a thread pool.
+        """
+        yield self.tree_text().encode('utf-8')
+        for record in self._read_ahead(self.iter_files()):
+            yield record.block
+
+    def aiter_files(self):
+        """Async variant of iter_files(); each record arrives with its block loaded.
+
+        Scanning and reading run in the event loop's default executor, so
+        using record.block does not block the loop.
+        """
+        return self._aiter(record.load() for record in self._read_ahead(self.iter_files()))
+
+    def aiter_blocks(self):
+        """Async variant of iter_blocks()."""
+        return self._aiter(self.iter_blocks())
+
+    @staticmethod
+    async def _aiter(iterator):
+        import asyncio
+        loop = asyncio.get_running_loop()
+        done = object()
+        while True:
+            item = await loop.run_in_executor(None, next, iterator, done)
+            if item is done:
+                return
+            yield item
+
+    def write_output(self):
+        """Writes the tree and all file blocks through self.sink, opening each output file once.
+
+        For plain text output the manifest is written as well; it doubles as
+        the random-access index used by `4gpt extract` and incremental runs.
+        Returns False if the output could not be written.
+        """
+        try:
+            with self.sink.open(self) as sink:
+                with self.profile.phase("write_tree"):
+                    sink.write_tree(self.tree_text().encode('utf-8'))
+                with self.profile.phase("write_files"):
+                    for record in self._read_ahead(self.iter_files()):
+                        sink.write_record(record)
+        except IOError as e:
+            print(f"Error writing to output file {self.output_file}: {e}")
+            return False
+        if self.sink.plain and getattr(self.sink, "index", None) is not None:
+            self._write_manifest(self.sink.index)
+        return True
+
     def generate_tree(self):
-        tree = DirectoryTree(
-            root_dir=self.root_dir,
-            exclude_dirs=set(), 
-            exclude_files=self.exclude_patterns, 
-            follow_symlinks_in_tree=self.follow_symlinks,
-            show_file_sizes=True
-        )
         try:
-            with open(self.output_file, 'w', encoding='utf-8') as f:
-                f.write("File Structure:\n")
-                tree_json_str = tree.to_json()
-                tree_data = json.loads(tree_json_str)
-                f.write(tree_data["tree_print"])
-                f.write("\n\n")
+            with open(self.output_file, 'wb') as f:
+                f.write(self.tree_text().encode('utf-8'))
         except IOError as e:
             print(f"Error writing to output file {self.output_file}: {e}")
             return
 
     def collect_files(self):
-        compiled_include_patterns = self._compile_patterns(list(self.include_patterns))
-        compiled_exclude_patterns = self._compile_patterns(list(self.exclude_patterns))
-        
         try:
-            with open(self.output_file, 'a', encoding='utf-8') as f_out:
-                for root, dirs, files in os.walk(self.root_dir, followlinks=self.follow_symlinks):
-                    dirs[:] = [
-                        d for d in dirs 
-                        if not any(fnmatch.fnmatch(d, pattern) for pattern in self.exclude_patterns)
-                    ]
-                    
-                    for file_name in files:
-                        file_path = os.path.join(root, file_name)
-                        
-                        # Calculate relative path for path-based pattern matching
-                        relative_path = os.path.relpath(file_path, self.root_dir)
-                        # Normalize to forward slashes (cross-platform compatibility)
-                        relative_path = relative_path.replace(os.sep, '/')
-                        
-                        # Match against BOTH filename and relative path
-                        # This enables both "*.v" (filename) and "spartan6/ddr3.v" (path) patterns
-                        included = any(
-                            re.fullmatch(pattern_re, file_name) or re.fullmatch(pattern_re, relative_path)
-                            for pattern_re in compiled_include_patterns
-                        )
-                        excluded = any(
-                            re.fullmatch(pattern_re, file_name) or re.fullmatch(pattern_re, relative_path)
-                            for pattern_re in compiled_exclude_patterns
-                        )
-                        
-                        if included and not excluded:
-                            self._append_file_content(f_out, file_path)
+            with open(self.output_file, 'ab') as f_out:
+                for record in self._read_ahead(self.iter_files()):
+                    record.write_to(f_out)
         except IOError as e:
             print(f"Error appending to output file {self.output_file}: {e}")
 
-    def _compile_patterns(self, patterns):
-        compiled = []
-        if not patterns: return compiled
-        for p in patterns:
-            if p == "*":
-                compiled.append(r"^.*$") 
-            elif p == "*.*":
-                 compiled.append(r"^.*\..*$") 
-            else:
-                translated = fnmatch.translate(p)
-                if translated.startswith("(?s:") and translated.endswith("\\Z"):
-                    regex_body = translated[4:-3] 
-                elif translated.endswith("\\Z"):
-                    regex_body = translated[:-2]
-                else: 
-                    regex_body = translated
-                compiled.append(f"^{regex_body}$")
-        return compiled
+    def load_index(self):
+        """Returns the manifest of the current output file, or None if it is missing or stale.
+
+        manifest["files"] maps each normalized path to its block in the output:
+        {"offset", "length", "size", "mtime_ns", "hash", "same_as"}.
+        """
+        try:
+            with open(self.manifest_file, 'r', encoding='utf-8') as f:
+                manifest = json.load(f)
+            st = os.stat(self.output_file)
+        except (OSError, ValueError):
+            return None
+        if manifest.get("version") != self.MANIFEST_VERSION:
+            return None
+        # The output was edited or rewritten by something else since
+        if manifest.get("output_size") != st.st_size or manifest.get("output_mtime_ns") != st.st_mtime_ns:
+            return None
+        return manifest
+
+    def _load_manifest(self):
+        """Returns the previous manifest if its blocks can be reused for the current settings."""
+        manifest = self.load_index()
+        # Blocks written with different content settings cannot be reused
+        if manifest is None or manifest.get("settings") != self._manifest_settings():
+            return None
+        return manifest
+
+    def _write_manifest(self, manifest_files):
+        """Records where each file's block is in the output file just written."""
+        try:
+            st = os.stat(self.output_file)
+        except OSError:
+            return
+        manifest = {
+            "version": self.MANIFEST_VERSION,
+            "settings": self._manifest_settings(),
+            "scan_started_ns": self._scan_started_ns,
+            "output_size": st.st_size,
+            "output_mtime_ns": st.st_mtime_ns,
+            "files": manifest_files,
+        }
+        try:
+            with open(self.manifest_file, 'w', encoding='utf-8') as f:
+                json.dump(manifest, f, separators=(",", ":"))
+        except IOError as e:
+            print(f"Error writing manifest {self.manifest_file}: {e}")
+
+    def _manifest_settings(self):
+        return {"max_file_bytes": self.max_file_bytes, "dedup": self.dedup,
+                "transforms": self.transforms.settings() if self.transforms else []}
+
+    def run_incremental(self):
+        """Rewrites the output, copying blocks of unchanged files from the previous output.
+
+        Returns False if the output could not be written.
+        """
+        previous = self._load_manifest()
+        previous_files = previous["files"] if previous else {}
+        # Files modified at or after the previous scan started may have changed
+        # again within the same mtime tick, so they are never trusted.
+        trusted_before_ns = previous["scan_started_ns"] if previous else 0
+        tree_lines, files = self._get_plan()
+
+        def same_as(file_path):
+            duplicate = self._duplicates.get(file_path)
+            return os.path.normpath(duplicate[0]) if duplicate else None
+
+        def is_reusable(file_path, file_size, mtime_ns):
+            old = previous_files.get(os.path.normpath(file_path))
+            return (old is not None and old["size"] == file_size and old["mtime_ns"] == mtime_ns
+                    and mtime_ns < trusted_before_ns and old.get("same_as") == same_as(file_path)
+                    and old.get("transform") == self._transform_context(file_path))
+
+        # Only changed and new files go through the (possibly parallel) reader
+        fresh_records = self._read_ahead(self._record(f) for f in files if not is_reusable(*f))
+        manifest_files = {}
+        reused = processed = 0
+        tmp_path = self.output_file + ".tmp"
+        old_output = None
+        try:
+            if previous:
+                old_output = open(self.output_file, 'rb')
+            with open(tmp_path, 'wb') as f_out:
+                f_out.write(self._tree_text(tree_lines).encode('utf-8'))
+                for file_path, file_size, mtime_ns in files:
+                    key = os.path.normpath(file_path)
+                    offset = f_out.tell()
+                    if is_reusable(file_path, file_size, mtime_ns):
+                        old = previous_files[key]
+                        old_output.seek(old["offset"])
+                        remaining = old["length"]
+                        while remaining > 0:
+                            chunk = old_output.read(min(remaining, 1024 * 1024))
+                            if not chunk:
+                                break
+                            f_out.write(chunk)
+                            remaining -= len(chunk)
+                        content_hash = old["hash"]
+                        reused += 1
+                        self.profile.add("files_reused")
+                    else:
+                        content_hash = next(fresh_records).write_to(f_out)
+                        if content_hash is None:
+                            continue
+                        processed += 1
+                    manifest_files[key] = {
+                        "mtime_ns": mtime_ns,
+                        "size": file_size,
+                        "hash": content_hash,
+                        "offset": offset,
+                        "length": f_out.tell() - offset,
+                        "same_as": same_as(file_path),
+                        "transform": self._transform_context(file_path),
+                    }
+        except IOError as e:
+            print(f"Error writing to output file {self.output_file}: {e}")
+            return False
+        finally:
+            fresh_records.close()
+            if old_output is not None:
+                old_output.close()
+
+        os.replace(tmp_path, self.output_file)
+        self._write_manifest(manifest_files)
+        removed = len(set(previous_files) - set(manifest_files))
+        print(f"Incremental run: {reused} reused, {processed} processed, {removed} removed.")
+        return True
 
     def _format_size(self, size_bytes):
         """Convert bytes to human-readable format."""
@@ -264,57 +1186,477 @@ class FileCollector:
             size_bytes /= 1024.0
         return f"{size_bytes:.1f} TB"
 
-    def _append_file_content(self, output_file_obj, file_path):
+    def _read_ahead(self, records):
+        """Yields the FileRecords in input order, loading their blocks ahead when jobs > 1.
+
+        Files up to STREAM_THRESHOLD are read in a thread pool; larger ones are
+        left for write_to() to stream. At most jobs * 4 blocks and
+        READ_AHEAD_BYTES of file data are pending at any time, so a large file
+        at the head of the queue cannot pile up the rest in memory.
+        """
+        if self.jobs <= 1:
+            yield from records
+            return
+
+        from concurrent.futures import ThreadPoolExecutor
+        pending = collections.deque()
+        pending_bytes = 0
+        with ThreadPoolExecutor(max_workers=self.jobs) as pool:
+            for record in records:
+                if record.size > self.STREAM_THRESHOLD:
+                    future = None
+                else:
+                    while pending and (len(pending) >= self.jobs * 4
+                                       or pending_bytes + record.size > self.READ_AHEAD_BYTES):
+                        done_record, done_future = pending.popleft()
+                        if done_future is not None:
+                            done_future.result()
+                            pending_bytes -= done_record.size
+                        yield done_record
+                    future = pool.submit(record.load)
+                    pending_bytes += record.size
+                pending.append((record, future))
+            while pending:
+                done_record, done_future = pending.popleft()
+                if done_future is not None:
+                    done_future.result()
+                yield done_record
+
+    def _read_block(self, file_path, file_size):
+        """Returns (block_bytes, content_hash) for one file; the hash is None if it cannot be read."""
+        buffer = io.BytesIO()
+        content_hash = self._timed_copy(buffer, file_path, file_size)
+        return buffer.getvalue(), content_hash
+
+    def _reference_block(self, file_path, file_size):
+        """Returns (block_bytes, content_hash) for a file that repeats an earlier file."""
+        original, content_hash = self._duplicates[file_path]
+        path = os.path.normpath(file_path)
+        block = (f"----- START OF {path} ({self._format_size(file_size)}) -----\n"
+                 f"----- SAME AS {os.path.normpath(original)} -----\n"
+                 f"----- END OF {path} -----\n\n\n")
+        return block.encode('utf-8'), content_hash
+
+    def _read_content(self, file_path):
+        """Returns the file text as _copy_file_block() writes it, or None if it cannot be read."""
         try:
-            if os.path.isdir(file_path): 
-                return
-            file_size = os.path.getsize(file_path)
-            size_str = self._format_size(file_size)
-            with open(file_path, 'r', encoding='utf-8', errors='ignore') as f_content:
-                content = f_content.read()
-            output_file_obj.write(f"----- START OF {os.path.normpath(file_path)} ({size_str}) -----\n")
-            output_file_obj.write(content)
-            output_file_obj.write(f"\n----- END OF {os.path.normpath(file_path)} -----\n\n\n")
-        except Exception as e:
-            pass 
+            with open(file_path, 'rb') as f:
+                raw = f.read() if self.max_file_bytes is None else f.read(self.max_file_bytes)
+        except OSError:
+            return None
+        transforms = self.transforms.for_path(file_path) if self.transforms else None
+        if transforms:
+            content_hash = hashlib.sha1(raw).hexdigest()
+            return self._transformed_bytes(file_path, raw, content_hash, transforms).decode('utf-8')
+        return self._decode(raw)
+
+    @staticmethod
+    def _decode(raw):
+        """Decodes file bytes like the output does: UTF-8, undecodable bytes ignored, universal newlines."""
+        decoder = io.IncrementalNewlineDecoder(
+            codecs.getincrementaldecoder('utf-8')(errors='ignore'), translate=True)
+        return decoder.decode(raw, final=True)
+
+    def _transformed_bytes(self, file_path, raw, content_hash, transforms):
+        """Returns the transformed text of raw as UTF-8, from the transform cache if it is there."""
+        from .transforms import TransformPipeline, iter_lines
+        cache = self._get_transform_cache()
+        key = cache.key(content_hash, self.transforms.key(file_path, transforms))
+        data = cache.get(key)
+        if data is None:
+            lines = iter_lines([self._decode(raw)])
+            data = "".join(TransformPipeline.run(lines, file_path, transforms)).encode('utf-8')
+            cache.put(key, data)
+            self.profile.add("files_transformed")
+        else:
+            self.profile.add("transform_cache_hits")
+        return data
+
+    def _copy_transformed(self, f_content, out, file_path, file_size, hasher, transforms):
+        """Writes the file content through the transforms into out; returns whether it was truncated.
+
+        Files up to STREAM_THRESHOLD are read whole, and their transformed text
+        is cached by content hash in cache_dir/transformed, so unchanged files
+        are not transformed again. Larger files are decoded and transformed
+        line by line as they are read, without caching.
+        """
+        from .transforms import TransformPipeline, iter_lines
+        limit = self.max_file_bytes
+        if file_size <= self.STREAM_THRESHOLD:
+            raw = f_content.read() if limit is None else f_content.read(limit)
+            truncated = limit is not None and f_content.read(1) != b""
+            hasher.update(raw)
+            out.write(self._transformed_bytes(file_path, raw, hasher.hexdigest(), transforms))
+            return truncated
+
+        decoder = io.IncrementalNewlineDecoder(
+            codecs.getincrementaldecoder('utf-8')(errors='ignore'), translate=True)
+        truncated = []
+
+        def chunks():
+            copied = 0
+            while limit is None or copied < limit:
+                chunk = f_content.read(self.CHUNK_SIZE if limit is None else min(self.CHUNK_SIZE, limit - copied))
+                if not chunk:
+                    break
+                copied += len(chunk)
+                hasher.update(chunk)
+                yield decoder.decode(chunk)
+            else:
+                truncated.append(f_content.read(1) != b"")
+            yield decoder.decode(b"", final=True)
+
+        for line in TransformPipeline.run(iter_lines(chunks()), file_path, transforms):
+            out.write(line.encode('utf-8'))
+        self.profile.add("files_transformed")
+        return bool(truncated) and truncated[0]
+
+    def _timed_copy(self, out, file_path, file_size):
+        if not self.profile.enabled:
+            return self._copy_file_block(out, file_path, file_size)
+        start = time.perf_counter()
+        content_hash = self._copy_file_block(out, file_path, file_size)
+        self.profile.record_file(os.path.normpath(file_path), time.perf_counter() - start, file_size)
+        return content_hash
+
+    def _copy_file_block(self, out, file_path, file_size):
+        """Streams one file block into the binary writer out and returns the content hash.
+
+        Files that are valid UTF-8 without carriage returns are copied as raw
+        bytes (see _copy_clean_utf8). Everything else is copied in CHUNK_SIZE
+        pieces and decoded incrementally, with the same result as reading the
+        file in text mode (undecodable bytes ignored, universal newlines).
+        Files over max_file_bytes are cut off with a TRUNCATED marker line.
+        Files that content transforms apply to go through _copy_transformed().
+        Returns None if the file cannot be read.
+        """
+        try:
+            f_content = open(file_path, 'rb')
+        except OSError:
+            return None
+        path = os.path.normpath(file_path)
+        limit = self.max_file_bytes
+        transforms = self.transforms.for_path(file_path) if self.transforms else None
+        hasher = hashlib.sha1()
+        decoder = io.IncrementalNewlineDecoder(
+            codecs.getincrementaldecoder('utf-8')(errors='ignore'), translate=True)
+        copied = 0
+        truncated = False
+        failed = False
+        with f_content:
+            out.write(f"----- START OF {path} ({self._format_size(file_size)}) -----\n".encode('utf-8'))
+            try:
+                if transforms:
+                    truncated = self._copy_transformed(f_content, out, file_path, file_size, hasher, transforms)
+                elif self._copy_clean_utf8(f_content, out, file_size, hasher):
+                    out.write(f"\n----- END OF {path} -----\n\n\n".encode('utf-8'))
+                    return hasher.hexdigest()
+                else:
+                    f_content.seek(0)
+                    hasher = hashlib.sha1()
+                    while True:
+                        size = self.CHUNK_SIZE
+                        if limit is not None:
+                            size = min(size, limit - copied)
+                            if size <= 0:
+                                truncated = f_content.read(1) != b""
+                                break
+                        chunk = f_content.read(size)
+                        if not chunk:
+                            break
+                        copied += len(chunk)
+                        hasher.update(chunk)
+                        out.write(decoder.decode(chunk).encode('utf-8'))
+            except OSError:
+                failed = True
+            out.write(decoder.decode(b"", final=True).encode('utf-8'))
+        if truncated:
+            out.write(f"\n----- TRUNCATED {path} after {self._format_size(limit)} -----".encode('utf-8'))
+        out.write(f"\n----- END OF {path} -----\n\n\n".encode('utf-8'))
+        return None if failed else hasher.hexdigest()
+
+    def _copy_clean_utf8(self, f_content, out, file_size, hasher):
+        """Copies content that needs no decoding straight through as bytes.
+
+        Returns False, with nothing written, if the content is not valid UTF-8,
+        contains '\\r' (which text mode would translate) or exceeds
+        max_file_bytes. Small files are read in one go; larger ones are
+        validated in CHUNK_SIZE pieces and then copied with os.copy_file_range /
+        os.sendfile, or read again in CHUNK_SIZE pieces when out has no file
+        descriptor (compressed output, in-memory blocks).
+        """
+        limit = self.max_file_bytes
+        if limit is not None and file_size > limit:
+            return False
+        if file_size < self.ZERO_COPY_MIN:
+            raw = f_content.read()
+            if (limit is not None and len(raw) > limit) or b"\r" in raw:
+                return False
+            try:
+                raw.decode('utf-8')
+            except UnicodeDecodeError:
+                return False
+            hasher.update(raw)
+            out.write(raw)
+            return True
+
+        # Validate in CHUNK_SIZE reads into one buffer, so memory use does not grow with the file
+        buffer = bytearray(self.CHUNK_SIZE)
+        decoder = codecs.getincrementaldecoder('utf-8')()
+        length = 0
+        with memoryview(buffer) as view:
+            while True:
+                n = f_content.readinto(buffer)
+                if not n:
+                    break
+                length += n
+                if (limit is not None and length > limit) or buffer.find(b"\r", 0, n) != -1:
+                    return False
+                with view[:n] as chunk:
+                    try:
+                        decoder.decode(chunk)
+                    except UnicodeDecodeError:
+                        return False
+                    hasher.update(chunk)
+        try:
+            decoder.decode(b"", final=True)
+        except UnicodeDecodeError:
+            return False
+
+        try:
+            out_fd = out.fileno()
+        except (AttributeError, OSError):
+            out_fd = None
+        if out_fd is not None:
+            out.flush()
+            if self._kernel_copy(f_content.fileno(), out_fd, length):
+                # The buffered writer does not know the file position moved underneath it
+                out.seek(0, os.SEEK_END)
+                return True
+        f_content.seek(0)
+        remaining = length
+        while remaining > 0:
+            chunk = f_content.read(min(remaining, self.CHUNK_SIZE))
+            if not chunk:
+                break
+            out.write(chunk)
+            remaining -= len(chunk)
+        return True
+
+    @staticmethod
+    def _kernel_copy(in_fd, out_fd, length):
+        """Copies length bytes from the start of in_fd to out_fd inside the kernel, if supported."""
+        for copy in (getattr(os, "copy_file_range", None), getattr(os, "sendfile", None)):
+            if copy is None:
+                continue
+            offset = 0
+            try:
+                while offset < length:
+                    if copy is os.sendfile:
+                        sent = os.sendfile(out_fd, in_fd, offset, length - offset)
+                    else:
+                        sent = os.copy_file_range(in_fd, out_fd, length - offset, offset_src=offset)
+                    if sent == 0:
+                        break
+                    offset += sent
+            except OSError:
+                # O_APPEND outputs and some filesystems reject copy_file_range
+                if offset == 0:
+                    continue
+                raise
+            if offset == length:
+                return True
+            if offset > 0:
+                raise OSError(f"short copy: {offset} of {length} bytes")
+        return False
 
     def run(self):
-        self.generate_tree()
-        self.collect_files()
+        """Scans root_dir and writes the output; returns False if it could not be written."""
+        # One scan feeds both the tree and the file contents
+        self.rescan()
+        self._get_plan()
+        if self.incremental and self.sink.plain:
+            with self.profile.phase("write_incremental"):
+                written = self.run_incremental()
+            self.output_paths = [self.output_file] if written else []
+        else:
+            if self.incremental:
+                print("Incremental mode needs plain text output; writing all files.")
+            written = self.write_output()
+            self.output_paths = list(self.sink.paths) if written else []
+        for path in self.output_paths:
+            try:
+                self.profile.add("bytes_written", os.path.getsize(path))
+            except OSError:
+                pass
+        if self.skipped_files:
+            reasons = collections.Counter(reason for _, reason in self.skipped_files)
+            details = ", ".join(f"{reason}: {count}" for reason, count in sorted(reasons.items()))
+            print(f"Skipped {len(self.skipped_files)} detected files ({details}).")
+        if self.budget_summary is not None:
+            used, omitted = self.budget_summary
+            print(f"Token budget: ~{used} of {self.max_tokens} tokens used, {omitted} files omitted.")
+        if self._duplicates:
+            print(f"Deduplicated {len(self._duplicates)} files with repeated content.")
+        if self._transform_cache is not None:
+            self._transform_cache.prune()
+        return written
 
-    def dry_run(self):
-        compiled_include_patterns = self._compile_patterns(list(self.include_patterns))
-        compiled_exclude_patterns = self._compile_patterns(list(self.exclude_patterns))
+    def dry_run(self, explain=False, top=10):
+        """Reports what a run would collect, using the same scan and matchers, without opening any file.
 
+        Prints the files and bytes that would be included, the estimated
+        tokens and the largest directories and extensions. Files are only
+        stat'ed: binary, minified and generated files are recognized from the
+        sniff cache of earlier runs. With explain=True, every file and excluded
+        directory is listed with the pattern that decided it.
+        """
         print("\n--- Dry Run Mode ---")
         print(f"Root directory: {os.path.abspath(self.root_dir)}")
         print(f"Following symlinks: {self.follow_symlinks}")
-        print(f"Include patterns (runtime): {sorted(list(self.include_patterns))}")
-        print(f"Exclude patterns (runtime): {sorted(list(self.exclude_patterns))}")
-        print("Scanning files...\n")
-
-        for root, dirs, files in os.walk(self.root_dir, followlinks=self.follow_symlinks):
-            dirs[:] = [
-                d for d in dirs 
-                if not any(fnmatch.fnmatch(d, pattern) for pattern in self.exclude_patterns)
-            ]
+        print(f"Include patterns (runtime): {sorted(self.include_patterns)}")
+        print(f"Exclude patterns (runtime): {sorted(self._effective_exclude_patterns())}")
 
-            for file_name in files:
-                file_path = os.path.join(root, file_name)
-                
-                included = any(re.fullmatch(p_re, file_name) for p_re in compiled_include_patterns)
-                excluded = any(re.fullmatch(p_re, file_name) for p_re in compiled_exclude_patterns)
-                
-                if included and not excluded:
-                    print(f"✅ {os.path.normpath(file_path)}")
+        decisions = [] if explain else None
+        with self.profile.phase("scan"):
+            tree_lines, files, tree_index = self.scan(decisions)
+
+        # Sniffing would open the files; use what earlier runs found out
+        detected = {}
+        unsniffed = 0
+        if self.skip_detected:
+            sniffer = self._get_sniffer()
+            for file_path, file_size, mtime_ns in files:
+                found, verdict = sniffer.cached_verdict(file_path, file_size, mtime_ns)
+                if not found:
+                    unsniffed += 1
+                elif verdict in self.skip_detected:
+                    detected[file_path] = verdict
+            files = [item for item in files if item[0] not in detected]
+        selected = files
+        if self.max_tokens is not None:
+            tree_lines, selected = self._pack_budget(tree_lines, files, tree_index)
+        selected_paths = {item[0] for item in selected}
+
+        if explain:
+            include_matcher, exclude_matcher = self._get_matchers()
+            print()
+            for file_path, relative_path, name, kind in sorted(decisions, key=lambda d: d[1]):
+                if kind == "included":
+                    if file_path in detected:
+                        print(f"❌ {relative_path}  detected as {detected[file_path]} (sniff cache)")
+                    elif file_path not in selected_paths:
+                        print(f"❌ {relative_path}  omitted: token budget")
+                    else:
+                        print(f"✅ {relative_path}  include \"{include_matcher.explain(name, relative_path)}\"")
+                elif kind == "excluded":
+                    print(f"❌ {relative_path}  exclude \"{exclude_matcher.explain(name, relative_path)}\"")
+                elif kind == "excluded_dir":
+                    print(f"❌ {relative_path}  exclude \"{exclude_matcher.explain(name, is_dir=True)}\" (not walked)")
+                elif kind == "not_a_file":
+                    print(f"❌ {relative_path}  include \"{include_matcher.explain(name, relative_path)}\", "
+                          f"but not a regular file")
                 else:
-                    reason = ""
-                    if not included: reason += " (no include match)"
-                    if excluded: reason += f" (exclude match)" 
-                    print(f"❌ {os.path.normpath(file_path)}{reason}")
+                    print(f"❌ {relative_path}  no include pattern matches")
+
+        estimator = self.token_estimator
+        total_bytes = sum(item[1] for item in selected)
+        tree_tokens = estimator.count(self._tree_text(tree_lines))
+        file_tokens = sum(estimator.estimate_size(self._estimated_block_bytes(item)) for item in selected)
+        counts = self.scan_counts
+        print(f"\nWould include: {len(selected):,} files, {self._format_size(total_bytes)}, "
+              f"~{tree_tokens + file_tokens:,} tokens (file tree: ~{tree_tokens:,})")
+        print(f"Scanned: {counts['dirs_visited']:,} directories, {counts['entries_seen']:,} entries, "
+              f"{counts['entries_excluded']:,} excluded by pattern")
+        if detected:
+            kinds = collections.Counter(detected.values())
+            details = ", ".join(f"{kind}: {count}" for kind, count in sorted(kinds.items()))
+            print(f"Skipped as detected (sniff cache): {len(detected):,} files ({details})")
+        if unsniffed:
+            print(f"Not sniffed yet: {unsniffed:,} files; a real run may still skip some as "
+                  f"{'/'.join(sorted(self.skip_detected))}")
+        if self.budget_summary is not None:
+            used, omitted = self.budget_summary
+            print(f"Token budget: ~{used:,} of {self.max_tokens:,} tokens used, {omitted:,} files omitted")
+        if self.dedup or self.transforms:
+            print("Sizes and tokens are upper bounds: --dedup and content transforms are not applied.")
+
+        by_dir = collections.defaultdict(lambda: [0, 0])
+        by_ext = collections.defaultdict(lambda: [0, 0])
+        root = os.path.normpath(self.root_dir)
+        for file_path, file_size, _ in selected:
+            directory = os.path.relpath(os.path.dirname(file_path) or ".", root)
+            name = os.path.basename(file_path)
+            extension = os.path.splitext(name)[1].lower() or name
+            for totals, key in ((by_dir, directory), (by_ext, extension)):
+                totals[key][0] += file_size
+                totals[key][1] += 1
+        for title, totals in (("directories", by_dir), ("extensions", by_ext)):
+            if not totals:
+                continue
+            print(f"\nLargest {title}:")
+            for key, (size, count) in sorted(totals.items(), key=lambda kv: (-kv[1][0], kv[0]))[:top]:
+                print(f"  {self._format_size(size):>10}  {count:>7,} files  {key}")
         print("\n--- End of Dry Run ---")
 
 
+def parse_size(text):
+    """Parses a byte count such as 500000, 512K, 20M or 1G (binary units)."""
+    units = {"K": 1024, "M": 1024 ** 2, "G": 1024 ** 3}
+    text = text.strip().upper().rstrip("B")
+    try:
+        if text and text[-1] in units:
+            return int(float(text[:-1]) * units[text[-1]])
+        return int(text)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid size: {text!r}")
+
+
+def deliver_output(output_file_path, to_clipboard):
+    """Copies the finished output file to the clipboard or prints it."""
+    if to_clipboard:
+        # In die Zwischenablage kopieren, direkt aus der Datei gestreamt
+        if os.path.exists(output_file_path):
+            if os.path.getsize(output_file_path) > 0:
+                copy_file_to_clipboard(output_file_path)
+            else:
+                print(f"Output file '{output_file_path}' is empty. Nothing to copy to clipboard.")
+        else:
+            print(f"Output file '{output_file_path}' not found. Cannot copy to clipboard.")
+    else: # Nicht --to-clipboard
+        if os.path.exists(output_file_path):
+            try:
+                if os.path.getsize(output_file_path) > 0:
+                    print("\n--- Content of " + output_file_path + " ---")
+                    # Wird in Blöcken ausgegeben, statt die ganze Datei in den Speicher zu lesen.
+                    # Zeichen, die die Konsole nicht darstellen kann, werden ersetzt.
+                    print_file(output_file_path)
+                    print("--- End of Content ---")
+                else:
+                    print(f"Output file '{output_file_path}' is empty. Nothing to display.")
+            except Exception as e:
+                print(f"Error reading or printing output file '{output_file_path}': {e}")
+        else:
+            print(f"Output file '{output_file_path}' not found. Cannot display content.")
+
+
+def deliver_from_daemon(collector, to_clipboard):
+    """Copies or prints the output served by a running `4gpt watch`; False if none is running."""
+    from .watch import connect_to_daemon
+    stream = connect_to_daemon(collector.cache_dir)
+    if stream is None:
+        print("No running '4gpt watch' found for this directory. Performing a normal run.")
+        return False
+    with stream:
+        if to_clipboard:
+            copy_stream_to_clipboard(stream)
+        else:
+            print("\n--- Content from 4gpt watch ---")
+            print_stream(stream)
+            print("--- End of Content ---")
+    return True
+
+
 def main():
     parser = argparse.ArgumentParser(
         description="FileCollector CLI to manage file inclusion and exclusion.",
@@ -326,6 +1668,19 @@ Examples:
   4gpt include "*.py" --permanent     # Permanently include Python files in local config.
   4gpt list-excludes --global-config  # List excludes from global config.
   4gpt --dry-run --follow-symlinks    # Dry run, following directory symlinks.
+  4gpt --dry-run --explain            # Dry run, naming the pattern that decided each file.
+  4gpt --incremental                  # Only re-read files that changed since the last run.
+  4gpt --jobs 16                      # Read files with 16 threads (useful on NFS / cold caches).
+  4gpt --max-tokens 100000 -c         # Fit the output into ~100k tokens, smallest files first.
+  4gpt --git                          # Only consider files tracked by git (no directory walk).
+  4gpt --dedup                        # Emit repeated file contents only once.
+  4gpt --compress gzip                # Write allfiles.txt.gz instead of allfiles.txt.
+  4gpt --shard-tokens 100000          # allfiles.000.txt, allfiles.001.txt, ... plus allfiles.index.json.
+  4gpt --profile --profile-json p.json # Report where the time goes, plus a JSON copy for CI.
+  4gpt watch                          # Keep allfiles.txt live while editing...
+  4gpt --from-daemon -c               # ...and copy the current output instantly.
+  4gpt batch roots.txt --workers 8    # One output per listed root directory, 8 processes.
+  4gpt extract "src/*.py" -o py.txt   # Pull single blocks out of allfiles.txt via its index.
 """,
         formatter_class=argparse.RawTextHelpFormatter
     )
@@ -333,12 +1688,42 @@ Examples:
     # Globale Optionen
     parser.add_argument('--dry-run', action='store_true',
                         help='Show which files would be included or excluded without writing output.')
+    parser.add_argument('--explain', action='store_true',
+                        help='Dry run that lists every file with the include/exclude pattern that decided it.')
     parser.add_argument('--global-config', action='store_true',
                         help='Use global config. If combined with --permanent, modifies global config.')
     parser.add_argument('--follow-symlinks', action='store_true',
                         help='Follow symbolic links to directories when collecting files and generating tree structure.')
     parser.add_argument('--to-clipboard', '-c', action='store_true',  # NEUER PARAMETER
                         help='Copy the content of the generated output file to the clipboard after a successful run.')
+    parser.add_argument('--git', action='store_true',
+                        help='Take the file list from the git index (git ls-files) instead of walking the directory.')
+    parser.add_argument('--git-untracked', action='store_true',
+                        help='Like --git, but also include untracked files that are not ignored by .gitignore.')
+    parser.add_argument('--jobs', '-j', type=int, default=1, metavar='N',
+                        help='Read files with N threads. Output order and content stay the same.')
+    parser.add_argument('--max-tokens', type=int, metavar='N',
+                        help='Only emit as many files as fit into roughly N tokens. Omitted files are marked in the tree.')
+    parser.add_argument('--pack', choices=sorted(FileCollector.PACK_POLICIES), default='smallest',
+                        help='Which files to keep first under --max-tokens (default: smallest).')
+    parser.add_argument('--profile', action='store_true',
+                        help='Print time per phase, counters, throughput and the slowest files after the run.')
+    parser.add_argument('--profile-json', metavar='FILE',
+                        help='Write the profile as JSON to FILE (implies --profile).')
+    parser.add_argument('--profile-cprofile', metavar='FILE',
+                        help='Write a cProfile dump of the whole command to FILE (view with python -m pstats).')
+    parser.add_argument('--from-daemon', action='store_true',
+                        help="Take the output from a running '4gpt watch' instead of doing a run.")
+    parser.add_argument('--compress', choices=["gzip", "zstd"],  # sinks.CODEC_EXTENSIONS
+                        help='Write the output compressed (<output_file>.gz / .zst). zstd needs Python 3.14+ or the zstandard package.')
+    parser.add_argument('--shard-size', type=parse_size, metavar='SIZE',
+                        help='Split the output into numbered shards of at most SIZE bytes (e.g. 20M), plus an index file.')
+    parser.add_argument('--shard-tokens', type=int, metavar='N',
+                        help='Split the output into numbered shards of at most ~N tokens each, plus an index file.')
+    parser.add_argument('--dedup', action='store_true',
+                        help='Replace files whose content repeats an earlier file with a SAME AS reference.')
+    parser.add_argument('--incremental', action='store_true',
+                        help='Reuse blocks of unchanged files from the previous output (tracked in <output_file>.manifest.json).')
 
     subparsers = parser.add_subparsers(dest="command", title="Commands",
                                        description="Available commands:",
@@ -364,6 +1749,21 @@ Examples:
     subparsers.add_parser("list-includes", help="List current include patterns based on effective config.")
     subparsers.add_parser("list-excludes", help="List current exclude patterns based on effective config.")
 
+    watch_parser = subparsers.add_parser("watch", help="Keep the output file up to date and serve it to --from-daemon clients.")
+    watch_parser.add_argument("--poll", action="store_true", help="Poll for changes instead of using inotify.")
+    watch_parser.add_argument("--debounce", type=float, default=0.3, metavar="SECONDS",
+                              help="Wait this long after the last change before updating (default: 0.3).")
+
+    extract_parser = subparsers.add_parser("extract", help="Copy the blocks of some files out of the output file using its index.")
+    extract_parser.add_argument("patterns", nargs="+", metavar="PATH", help="Paths or glob patterns as shown in the START OF headers (e.g. 'src/*.py').")
+    extract_parser.add_argument("--output", "-o", metavar="FILE", help="Write the blocks to FILE instead of printing them.")
+    extract_parser.add_argument("--list", action="store_true", help="Only list the matching files with their offset and length.")
+
+    batch_parser = subparsers.add_parser("batch", help="Run for every root directory listed in a file, one output per root.")
+    batch_parser.add_argument("roots_file", help="File with one root directory per line ('-' reads stdin, '#' starts a comment).")
+    batch_parser.add_argument("--workers", "-w", type=int, default=os.cpu_count(), metavar="N",
+                              help="Number of worker processes (default: number of CPUs).")
+    batch_parser.add_argument("--summary-json", metavar="FILE", help="Also write the per-root results and totals as JSON to FILE.")
 
     args = parser.parse_args()
 
@@ -373,15 +1773,47 @@ Examples:
        args.permanent and not use_global_conf_cli:
         collector_init_permanent_flag = True
     
+    sink = None  # plain text
+    if args.shard_size or args.shard_tokens:
+        from .sinks import ShardedSink
+        sink = ShardedSink(max_bytes=args.shard_size, max_tokens=args.shard_tokens, codec=args.compress)
+    elif args.compress:
+        from .sinks import CompressedSink
+        sink = CompressedSink(args.compress)
+
+    # Shared by the collector below and the per-root collectors of `batch`
+    collector_options = dict(
+        use_global_config=use_global_conf_cli,
+        follow_symlinks=args.follow_symlinks,
+        incremental=args.incremental,
+        jobs=args.jobs,
+        max_tokens=args.max_tokens,
+        pack_policy=args.pack,
+        use_git=args.git,
+        git_untracked=args.git_untracked,
+        dedup=args.dedup,
+        sink=sink
+    )
     collector = FileCollector(
         root_dir=".", 
-        use_global_config=use_global_conf_cli, 
         permanent=collector_init_permanent_flag,
-        follow_symlinks=args.follow_symlinks
+        **collector_options
     )
 
+    profile = None
+    if args.profile or args.profile_json:
+        from .profiling import RunProfile
+        profile = RunProfile()
+        collector.profile = profile
+    cprofiler = None
+    if args.profile_cprofile:
+        import cProfile
+        cprofiler = cProfile.Profile()
+        cprofiler.enable()
+
     action_is_permanent = args.permanent if hasattr(args, 'permanent') and args.permanent else False
     command_executed = True 
+    exit_code = 0
 
     if args.command == "include":
         collector.add_include(args.pattern, permanent=action_is_permanent)
@@ -401,69 +1833,65 @@ Examples:
         collector.list_includes()
     elif args.command == "list-excludes":
         collector.list_excludes()
+    elif args.command == "watch":
+        from .watch import WatchDaemon
+        WatchDaemon(collector, debounce=args.debounce, use_polling=args.poll).serve_forever()
+    elif args.command == "extract":
+        from .extract import extract
+        if not extract(collector, args.patterns, args.output, args.list):
+            exit_code = 1
+    elif args.command == "batch":
+        from .batch import read_roots, run_batch
+        try:
+            roots = read_roots(args.roots_file)
+        except OSError as e:
+            print(f"Error reading roots file {args.roots_file}: {e}")
+            sys.exit(1)
+        if run_batch(roots, args.workers, collector_options, args.summary_json):
+            exit_code = 1
     else:
         command_executed = False
 
 
-    if args.dry_run:
-        collector.dry_run()
+    if args.dry_run or args.explain:
+        collector.dry_run(explain=args.explain)
         # Nach einem Dry-Run wird nichts in die Zwischenablage kopiert
         # und auch kein Dateiinhalt direkt geprintet, da die Datei nicht (final) geschrieben wurde.
+    elif not command_executed and args.from_daemon and deliver_from_daemon(collector, args.to_clipboard):
+        pass
     elif not command_executed: # Kein Subkommando wurde ausgeführt, also ein normaler Run
         # print(f"Performing run... (Follow symlinks: {args.follow_symlinks})")
         try:
-            collector.run() # Führt generate_tree() und collect_files() aus
-            output_file_path = os.path.join(collector.root_dir, collector.output_file)
-            print(f"Run finished. Output written to {output_file_path}")
+            collector.run() # Schreibt Baum und Dateiinhalte über collector.sink
+            if not collector.sink.plain:
+                # Komprimierte oder aufgeteilte Ausgabe wird weder angezeigt noch kopiert
+                paths = collector.output_paths
+                written = ", ".join(paths) if len(paths) <= 4 else f"{paths[0]} ... {paths[-1]} ({len(paths)} files)"
+                print(f"Run finished. Output written to {written}")
+            else:
+                output_file_path = os.path.join(collector.root_dir, collector.output_file)
+                print(f"Run finished. Output written to {output_file_path}")
 
-            if args.to_clipboard:
-                # In die Zwischenablage kopieren
-                if os.path.exists(output_file_path):
-                    try:
-                        with open(output_file_path, 'r', encoding='utf-8') as f:
-                            content_to_copy = f.read()
-                        if content_to_copy:
-                            copy_to_clipboard(content_to_copy)
-                        else:
-                            print(f"Output file '{output_file_path}' is empty. Nothing to copy to clipboard.")
-                    except Exception as e:
-                        print(f"Error reading output file '{output_file_path}' for clipboard: {e}")
-                else:
-                    print(f"Output file '{output_file_path}' not found. Cannot copy to clipboard.")
-            else: # Nicht --to-clipboard
-                if os.path.exists(output_file_path):
-                    try:
-                        with open(output_file_path, 'r', encoding='utf-8') as f:
-                            file_content = f.read()
-                        if file_content:
-                            print("\n--- Content of " + output_file_path + " ---")
-                            
-                            # Bestimme das Encoding von stdout, mit Fallback auf ASCII
-                            stdout_encoding = sys.stdout.encoding if sys.stdout.encoding else 'ascii'
-                            
-                            # Versuche, den String für stdout zu kodieren und dabei Fehler zu ersetzen,
-                            # dann wieder zu dekodieren, um ihn an print() zu übergeben.
-                            # print() wird dann versuchen, diesen (potenziell modifizierten) String
-                            # erneut gemäß sys.stdout.encoding zu behandeln.
-                            # Diese Methode ist etwas umständlich, aber ein Weg, den Fehler abzufangen.
-                            try:
-                                print(file_content) # Erster Versuch
-                            except UnicodeEncodeError:
-                                print(f"Warning: Console encoding '{stdout_encoding}' cannot display all characters. Replacing unmappable characters.")
-                                # Kodieren mit Fehlerersetzung, dann für print wieder dekodieren
-                                # Dies stellt sicher, dass print einen String erhält, den es verarbeiten kann,
-                                # auch wenn das bedeutet, dass einige Zeichen durch '?' ersetzt wurden.
-                                printable_content = file_content.encode(stdout_encoding, errors='replace').decode(stdout_encoding)
-                                print(printable_content)
-                            print("--- End of Content ---")
-                        else:
-                            print(f"Output file '{output_file_path}' is empty. Nothing to display.")
-                    except Exception as e:
-                        print(f"Error reading or printing output file '{output_file_path}': {e}")
-                else:
-                    print(f"Output file '{output_file_path}' not found. Cannot display content.")
+                with collector.profile.phase("clipboard" if args.to_clipboard else "print"):
+                    deliver_output(output_file_path, args.to_clipboard)
         except Exception as e:
             print(f"An error occurred during the run: {e}")
 
+    if cprofiler is not None:
+        cprofiler.disable()
+        cprofiler.dump_stats(args.profile_cprofile)
+        print(f"cProfile data written to {args.profile_cprofile}")
+    if profile is not None:
+        profile.finish()
+        profile.print_report()
+        if args.profile_json:
+            try:
+                profile.write_json(args.profile_json)
+                print(f"Profile written to {args.profile_json}")
+            except OSError as e:
+                print(f"Error writing profile to {args.profile_json}: {e}")
+    if exit_code:
+        sys.exit(exit_code)
+
 if __name__ == "__main__":
     main()
\ No newline at end of file
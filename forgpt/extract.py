@@ -0,0 +1,85 @@
+import collections
+import fnmatch
+import io
+import mmap
+import os
+import shutil
+
+from .core import print_stream
+
+
+class _BlockReader(io.RawIOBase):
+    """Reads the given (offset, length) ranges of a mapped output file one after another."""
+
+    def __init__(self, mapped, ranges):
+        self._view = memoryview(mapped)
+        self._ranges = collections.deque(ranges)
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        while self._ranges:
+            offset, length = self._ranges[0]
+            if length == 0:
+                self._ranges.popleft()
+                continue
+            n = min(len(buffer), length)
+            with self._view[offset:offset + n] as chunk:
+                buffer[:n] = chunk
+            self._ranges[0] = (offset + n, length - n)
+            return n
+        return 0
+
+    def close(self):
+        self._view.release()
+        super().close()
+
+
+def select_blocks(files, patterns):
+    """Returns the index entries matching any of the paths or glob patterns, in output order."""
+    exact = set()
+    globs = []
+    for pattern in patterns:
+        pattern = os.path.normpath(pattern)
+        if any(c in pattern for c in "*?["):
+            globs.append(pattern)
+        else:
+            exact.add(pattern)
+    selected = [(path, entry) for path, entry in files.items()
+                if path in exact or any(fnmatch.fnmatch(path, pattern) for pattern in globs)]
+    return sorted(selected, key=lambda item: item[1]["offset"])
+
+
+def extract(collector, patterns, out_path=None, list_only=False):
+    """Copies the blocks of the matching files out of the output file, using its index.
+
+    Only the selected byte ranges are read; the rest of the output file is never
+    touched. Returns the number of blocks extracted.
+    """
+    manifest = collector.load_index()
+    if manifest is None:
+        print(f"No up-to-date index for {collector.output_file}: {collector.manifest_file} is missing, or the "
+              f"output was changed after it was written. Run 4gpt (without --compress or --shard-*) to write both.")
+        return 0
+    selected = select_blocks(manifest["files"], patterns)
+    if not selected:
+        print("No files in the index match: " + " ".join(patterns))
+        return 0
+
+    if list_only:
+        for path, entry in selected:
+            same_as = f"  (same as {entry['same_as']})" if entry.get("same_as") else ""
+            print(f"{entry['offset']:>14,} {entry['length']:>12,}  {path}{same_as}")
+        return len(selected)
+
+    ranges = [(entry["offset"], entry["length"]) for _, entry in selected]
+    with open(collector.output_file, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+        with io.BufferedReader(_BlockReader(mapped, ranges)) as reader:
+            if out_path is None:
+                print_stream(reader)
+            else:
+                with open(out_path, 'wb') as out:
+                    shutil.copyfileobj(reader, out)
+                print(f"Extracted {len(selected)} files to {out_path}")
+    return len(selected)
@@ -0,0 +1,127 @@
+import collections
+import contextlib
+import heapq
+import json
+import threading
+import time
+
+
+class RunProfile:
+    """Collects phase timings, counters and the slowest files of one run."""
+    enabled = True
+
+    def __init__(self, slowest=10):
+        self.slowest = slowest
+        self.phases = {}
+        self.counts = collections.Counter()
+        self._slowest_files = []
+        self._lock = threading.Lock()
+        self._started = time.perf_counter()
+        self._finished = None
+
+    @contextlib.contextmanager
+    def phase(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add_time(name, time.perf_counter() - start)
+
+    def add_time(self, name, seconds):
+        with self._lock:
+            self.phases[name] = self.phases.get(name, 0.0) + seconds
+
+    def add(self, name, value=1):
+        with self._lock:
+            self.counts[name] += value
+
+    def record_file(self, path, seconds, size):
+        """Called once per copied file, possibly from worker threads."""
+        with self._lock:
+            self.counts["files_copied"] += 1
+            self.counts["bytes_read"] += size
+            entry = (seconds, path, size)
+            if len(self._slowest_files) < self.slowest:
+                heapq.heappush(self._slowest_files, entry)
+            else:
+                heapq.heappushpop(self._slowest_files, entry)
+
+    def finish(self):
+        self._finished = time.perf_counter()
+
+    def report(self):
+        total = (self._finished or time.perf_counter()) - self._started
+        return {
+            "total_seconds": total,
+            "phases": dict(self.phases),
+            "counts": dict(self.counts),
+            "throughput": {
+                "files_per_second": self.counts["files_copied"] / total if total else 0.0,
+                "mb_read_per_second": self.counts["bytes_read"] / total / 1e6 if total else 0.0,
+            },
+            "slowest_files": [
+                {"path": path, "seconds": seconds, "size": size}
+                for seconds, path, size in sorted(self._slowest_files, reverse=True)
+            ],
+        }
+
+    def print_report(self):
+        report = self.report()
+        print("\n--- Profile ---")
+        print(f"Total: {report['total_seconds']:.3f} s")
+        for name, seconds in report["phases"].items():
+            print(f"  {name:<20} {seconds:9.3f} s")
+        for name, value in sorted(report["counts"].items()):
+            print(f"  {name:<20} {value:>12,}")
+        throughput = report["throughput"]
+        print(f"Throughput: {throughput['files_per_second']:,.0f} files/s, "
+              f"{throughput['mb_read_per_second']:,.1f} MB/s read")
+        if report["slowest_files"]:
+            print(f"Slowest {len(report['slowest_files'])} files:")
+            for entry in report["slowest_files"]:
+                print(f"  {entry['seconds'] * 1000:9.2f} ms  {entry['size']:>12,} B  {entry['path']}")
+        print("--- End of Profile ---")
+
+    def write_json(self, path):
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.report(), f, indent=4)
+
+
+class NullProfile:
+    """Does nothing; used when profiling is off so call sites need no checks."""
+    enabled = False
+
+    def phase(self, name):
+        return contextlib.nullcontext()
+
+    def add_time(self, name, seconds):
+        pass
+
+    def add(self, name, value=1):
+        pass
+
+    def record_file(self, path, seconds, size):
+        pass
+
+
+class TimedMatcher:
+    """Wraps a PatternMatcher and adds the time spent matching to a profile phase."""
+
+    def __init__(self, matcher, profile, phase_name):
+        self._matcher = matcher
+        self._profile = profile
+        self._phase_name = phase_name
+
+    def matches(self, name, relative_path=None):
+        start = time.perf_counter()
+        try:
+            return self._matcher.matches(name, relative_path)
+        finally:
+            self._profile.add_time(self._phase_name, time.perf_counter() - start)
+
+    def matches_dir(self, name):
+        start = time.perf_counter()
+        try:
+            return self._matcher.matches_dir(name)
+        finally:
+            self._profile.add_time(self._phase_name, time.perf_counter() - start)
@@ -0,0 +1,225 @@
+import json
+import os
+
+# File name suffix added by each compression codec
+CODEC_EXTENSIONS = {"gzip": ".gz", "zstd": ".zst"}
+
+
+def open_compressed(path, codec, level=None):
+    """Opens path for binary writing through the gzip or zstd compressor.
+
+    zstd uses the standard library module on Python 3.14+ and the optional
+    'zstandard' package otherwise.
+    """
+    if codec == "gzip":
+        import gzip
+        return gzip.open(path, 'wb', compresslevel=6 if level is None else level)
+    if codec != "zstd":
+        raise ValueError(f"Unknown compression codec: {codec}")
+    try:
+        from compression import zstd
+    except ImportError:
+        pass
+    else:
+        return zstd.open(path, 'wb', level=level)
+    try:
+        import zstandard
+    except ImportError:
+        raise RuntimeError("zstd output needs Python 3.14+ or the 'zstandard' package (pip install zstandard)")
+    compressor = zstandard.ZstdCompressor(level=3 if level is None else level)
+    return compressor.stream_writer(open(path, 'wb'), closefd=True)
+
+
+class _CountingWriter:
+    """Counts the bytes written to a compressed stream.
+
+    It also hides the stream's fileno(), so file blocks are never copied by the
+    kernel past the compressor into the underlying file.
+    """
+    __slots__ = ("_stream", "bytes_written")
+
+    def __init__(self, stream):
+        self._stream = stream
+        self.bytes_written = 0
+
+    def write(self, data):
+        self.bytes_written += len(data)
+        return self._stream.write(data)
+
+
+class PlainTextSink:
+    """Writes the output to one uncompressed file (the default).
+
+    Sinks receive the tree section and then the file records in output order:
+    open(collector), write_tree(data), write_record(record) for each file,
+    close(). After open(), paths lists the files the sink writes. index maps
+    each written path to the position of its block, for the manifest.
+    """
+    # One uncompressed file: can be printed, copied and updated incrementally
+    plain = True
+
+    def __init__(self):
+        self.paths = []
+        self.index = None
+        self._file = None
+
+    def open(self, collector):
+        self.paths = [collector.output_file]
+        self.index = {}
+        self._file = open(collector.output_file, 'wb')
+        return self
+
+    def write_tree(self, data):
+        self._file.write(data)
+
+    def write_record(self, record):
+        """Writes one file block and returns its content hash (None if the file could not be read)."""
+        offset = self._file.tell()
+        content_hash = record.write_to(self._file)
+        if content_hash is not None:
+            self.index[os.path.normpath(record.path)] = {
+                "mtime_ns": record.mtime_ns,
+                "size": record.size,
+                "hash": content_hash,
+                "offset": offset,
+                "length": self._file.tell() - offset,
+                "same_as": os.path.normpath(record.same_as) if record.same_as else None,
+                "transform": record.transform_context,
+            }
+        return content_hash
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+class CompressedSink(PlainTextSink):
+    """Streams the output through gzip or zstd into <output_file>.gz / .zst."""
+    plain = False
+
+    def __init__(self, codec="gzip", level=None):
+        super().__init__()
+        if codec not in CODEC_EXTENSIONS:
+            raise ValueError(f"Unknown compression codec: {codec}")
+        self.codec = codec
+        self.level = level
+        self._writer = None
+
+    def open(self, collector):
+        path = collector.output_file + CODEC_EXTENSIONS[self.codec]
+        self.paths = [path]
+        self._file = open_compressed(path, self.codec, self.level)
+        self._writer = _CountingWriter(self._file)
+        return self
+
+    def write_tree(self, data):
+        self._writer.write(data)
+
+    def write_record(self, record):
+        return record.write_to(self._writer)
+
+
+class ShardedSink(PlainTextSink):
+    """Splits the output into allfiles.000.txt, allfiles.001.txt, ... plus allfiles.index.json.
+
+    A new shard is started before a file block that would take the current
+    shard over max_bytes or max_tokens (uncompressed, estimated from the file
+    size for blocks that are not read yet). A block that is larger than the
+    limit on its own gets a shard to itself. The tree section opens the first
+    shard. The index lists the paths in each shard. Shards can be compressed
+    as well (codec="gzip" or "zstd").
+    """
+    plain = False
+    INDEX_VERSION = 1
+
+    def __init__(self, max_bytes=None, max_tokens=None, codec=None, level=None):
+        super().__init__()
+        if max_bytes is None and max_tokens is None:
+            raise ValueError("ShardedSink needs max_bytes or max_tokens")
+        if codec is not None and codec not in CODEC_EXTENSIONS:
+            raise ValueError(f"Unknown compression codec: {codec}")
+        self.max_bytes = max_bytes
+        self.max_tokens = max_tokens
+        self.codec = codec
+        self.level = level
+        self.index_path = None
+        self._collector = None
+        self._shards = []
+        self._writer = None
+
+    def open(self, collector):
+        self._collector = collector
+        base, ext = os.path.splitext(collector.output_file)
+        self._name_format = base + ".{:03d}" + ext + CODEC_EXTENSIONS.get(self.codec, "")
+        self.index_path = base + ".index.json"
+        self.paths = []
+        self._shards = []
+        return self
+
+    def _start_shard(self):
+        self._close_shard()
+        path = self._name_format.format(len(self._shards))
+        if self.codec is None:
+            self._file = open(path, 'wb')
+            self._writer = None
+        else:
+            self._file = open_compressed(path, self.codec, self.level)
+            self._writer = _CountingWriter(self._file)
+        self.paths.append(path)
+        self._shards.append({"file": path, "bytes": 0, "tokens": 0, "paths": []})
+
+    def _close_shard(self):
+        if self._file is None:
+            return
+        self._shards[-1]["bytes"] = self._shard_bytes()
+        self._file.close()
+        self._file = None
+
+    def _shard_bytes(self):
+        return self._file.tell() if self._writer is None else self._writer.bytes_written
+
+    def write_tree(self, data):
+        self._start_shard()
+        (self._writer or self._file).write(data)
+        self._shards[-1]["tokens"] += self._collector.token_estimator.estimate_size(len(data))
+
+    def write_record(self, record):
+        block_bytes = record.estimated_bytes
+        block_tokens = self._collector.token_estimator.estimate_size(block_bytes)
+        shard = self._shards[-1] if self._shards else None
+        if shard is None or (shard["paths"] and (
+                (self.max_bytes is not None and self._shard_bytes() + block_bytes > self.max_bytes)
+                or (self.max_tokens is not None and shard["tokens"] + block_tokens > self.max_tokens))):
+            self._start_shard()
+            shard = self._shards[-1]
+        content_hash = record.write_to(self._writer or self._file)
+        shard["tokens"] += block_tokens
+        shard["paths"].append(os.path.normpath(record.path))
+        return content_hash
+
+    def close(self):
+        if self._collector is None:
+            return
+        self._close_shard()
+        # Shards left over from an earlier run that needed more of them
+        stale = len(self._shards)
+        while os.path.exists(self._name_format.format(stale)):
+            os.remove(self._name_format.format(stale))
+            stale += 1
+        index = {
+            "version": self.INDEX_VERSION,
+            "max_bytes": self.max_bytes,
+            "max_tokens": self.max_tokens,
+            "shards": self._shards,
+        }
+        with open(self.index_path, 'w', encoding='utf-8') as f:
+            json.dump(index, f, indent=1)
+        self.paths.append(self.index_path)
+        self._collector = None
@@ -0,0 +1,685 @@
+import fnmatch
+import hashlib
+import json
+import os
+import re
+import threading
+
+# Part of every cache key; bump when a transform changes its output
+TRANSFORM_VERSION = 4
+
+# Comment and string syntax per language. "line" starts a comment that runs to
+# the end of the line, "block" holds (start, end) pairs, "strings" lists the
+# string delimiters (longest first) and "multiline" those that may span lines.
+# Optional: "heredoc" is the operator that starts a here-document ("tight" if
+# no space may follow it, as in Ruby, where "a << b" appends), "regex" marks
+# /.../ literals (JavaScript), "attributes" #[...] attributes (PHP 8) and "url"
+# unquoted url(...) values (SCSS), whose contents are not comments either.
+SYNTAX = {
+    "python": {"line": ("#",), "block": (), "strings": ('"""', "'''", '"', "'"), "multiline": ('"""', "'''")},
+    "shell": {"line": ("#",), "block": (), "strings": ('"', "'"), "multiline": (), "heredoc": "<<"},
+    "ruby": {"line": ("#",), "block": (), "strings": ('"', "'"), "multiline": (), "heredoc": "<<", "tight": True},
+    "r": {"line": ("#",), "block": (), "strings": ('"', "'", "`"), "multiline": ('"', "'", "`")},
+    "powershell": {"line": ("#",), "block": (("<#", "#>"),), "strings": ('"', "'"), "multiline": ()},
+    "ini": {"line": (";", "#"), "block": (), "strings": (), "multiline": ()},
+    "c": {"line": ("//",), "block": (("/*", "*/"),), "strings": ('"""', '"', "'"), "multiline": ('"""',)},
+    "javascript": {"line": ("//",), "block": (("/*", "*/"),), "strings": ('"', "'", "`"), "multiline": ("`",),
+                   "regex": True},
+    "go": {"line": ("//",), "block": (("/*", "*/"),), "strings": ('"', "'", "`"), "multiline": ("`",)},
+    "php": {"line": ("//", "#"), "block": (("/*", "*/"),), "strings": ('"', "'"), "multiline": (),
+            "heredoc": "<<<", "attributes": True},
+    "css": {"line": (), "block": (("/*", "*/"),), "strings": ('"', "'"), "multiline": ()},
+    "scss": {"line": ("//",), "block": (("/*", "*/"),), "strings": ('"', "'"), "multiline": (), "url": True},
+    "sql": {"line": ("--",), "block": (("/*", "*/"),), "strings": ("'", '"'), "multiline": ()},
+    "markup": {"line": (), "block": (("<!--", "-->"),), "strings": (), "multiline": ()},
+}
+
+LANGUAGES = {
+    ".py": "python", ".pyi": "python",
+    ".sh": "shell", ".bash": "shell", ".zsh": "shell", ".pl": "shell",
+    ".rb": "ruby", ".r": "r",
+    ".yaml": "shell", ".yml": "shell", ".toml": "shell", "Dockerfile": "shell", "Makefile": "shell",
+    ".ps1": "powershell",
+    ".ini": "ini", ".cfg": "ini",
+    ".c": "c", ".h": "c", ".cpp": "c", ".hpp": "c", ".cc": "c", ".cs": "c", ".java": "c",
+    ".kt": "c", ".swift": "c", ".rs": "c",
+    ".js": "javascript", ".jsx": "javascript", ".mjs": "javascript", ".ts": "javascript", ".tsx": "javascript",
+    ".go": "go",
+    ".php": "php",
+    ".css": "css", ".scss": "scss",
+    ".sql": "sql",
+    ".html": "markup", ".htm": "markup", ".xml": "markup", ".svg": "markup", ".vue": "markup",
+}
+
+LICENSE_RE = re.compile(r"licen[cs]e|copyright|SPDX-License-Identifier|\(c\)", re.IGNORECASE)
+# Start of the line LicenseHeaders puts in place of a repeated header
+LICENSE_MARKER = "----- LICENSE HEADER AS IN "
+
+# Python string prefixes that can precede a docstring's quotes
+DOCSTRING_PREFIXES = {"", "r", "u", "R", "U"}
+
+# The rest of a here-document operator: <<EOF, <<-'EOF', <<~EOS (Ruby), <<<"EOT" (PHP)
+HEREDOC_RE = re.compile(r"([-~]?)[ \t]*([\"']?)([A-Za-z_]\w*)\2")
+TIGHT_HEREDOC_RE = re.compile(r"([-~]?)([\"'`]?)([A-Za-z_]\w*)\2")
+# Code before a "/" that makes it start a regex literal rather than divide
+REGEX_PRECEDER_RE = re.compile(
+    r"(?:^|[(,=:\[!&|?{};+\-*%<>~^]|\b(?:return|typeof|instanceof|in|of|new|delete|void|throw|case|do|else"
+    r"|yield|await))\s*$")
+# The rest of a regex literal after its opening "/", character classes included
+REGEX_BODY_RE = re.compile(r"(?:\\.|\[(?:\\.|[^\]\\])*\]|[^/\\\[])+/")
+# The rest of an unquoted url(...) value; quoted ones are strings
+URL_BODY_RE = re.compile(r"[ \t]*[^\s\"'()]*[ \t]*\)")
+
+
+def language_of(path):
+    """Returns the SYNTAX key for path from its extension (or name, e.g. Dockerfile), or None."""
+    name = os.path.basename(path)
+    if name in LANGUAGES:
+        return LANGUAGES[name]
+    return LANGUAGES.get(os.path.splitext(name)[1].lower())
+
+
+def iter_lines(chunks):
+    """Splits an iterable of text chunks into lines that keep their "\\n"."""
+    rest = ""
+    for chunk in chunks:
+        lines = (rest + chunk).split("\n")
+        rest = lines.pop()
+        for line in lines:
+            yield line + "\n"
+    if rest:
+        yield rest
+
+
+class _Scanner:
+    """Finds comments in source lines, skipping comment markers inside string literals."""
+
+    def __init__(self, syntax):
+        self.tokens = {}
+        for token in syntax["strings"]:
+            self.tokens[token] = ("string", token)
+        for start, end in syntax["block"]:
+            self.tokens[start] = ("block", end)
+        for token in syntax["line"]:
+            self.tokens[token] = ("line", None)
+        if syntax.get("heredoc"):
+            self.tokens[syntax["heredoc"]] = ("heredoc", None)
+        self.heredoc_re = TIGHT_HEREDOC_RE if syntax.get("tight") else HEREDOC_RE
+        if syntax.get("regex"):
+            self.tokens["/"] = ("regex", None)
+        if syntax.get("url"):
+            self.tokens["url("] = ("url", None)
+        self.multiline = set(syntax["multiline"])
+        alternatives = []
+        for token in sorted(self.tokens, key=len, reverse=True):
+            # '#' and ';' only start a comment at the start of a word ($#, ${#x}, a;b)
+            prefix = r"(?<!\S)" if token in ("#", ";") else r"(?<![\w-])" if token == "url(" else ""
+            suffix = r"(?!\[)" if token == "#" and syntax.get("attributes") else ""
+            alternatives.append(prefix + re.escape(token) + suffix)
+        self.token_re = re.compile("|".join(alternatives)) if alternatives else None
+        self.string_end = {token: re.compile(r"\\.|" + re.escape(token)) for token in syntax["strings"]}
+
+
+class StripComments:
+    """Removes comments and, for Python, docstrings from source files.
+
+    Comment markers inside string literals are left alone. Lines that only held
+    a comment are dropped; lines with code keep the code, without trailing
+    whitespace. A "#!" line at the top is kept. With license_headers (the
+    LicenseHeaders transform running before), the headers that other files
+    point to and the marker lines pointing to them are kept as well.
+    """
+    name = "strip_comments"
+
+    def __init__(self, comments=True, docstrings=False, license_headers=None):
+        self.comments = comments
+        self.docstrings = docstrings
+        self.license_headers = license_headers
+        self._scanners = {}
+
+    def settings(self):
+        return {"comments": self.comments, "docstrings": self.docstrings}
+
+    def applies(self, path):
+        language = language_of(path)
+        if language is None:
+            return False
+        return self.comments or language == "python"
+
+    def context(self, path):
+        if self.license_headers is not None and self.license_headers.is_referenced(path):
+            return "keep_license_header"
+        return None
+
+    def _scanner(self, language):
+        scanner = self._scanners.get(language)
+        if scanner is None:
+            scanner = self._scanners[language] = _Scanner(SYNTAX[language])
+        return scanner
+
+    def __call__(self, lines, path):
+        language = language_of(path)
+        scanner = self._scanner(language)
+        docstrings = self.docstrings and language == "python"
+        comments = self.comments
+        token_re = scanner.token_re
+        # Closing delimiter of the string or comment that is open at the end of
+        # the line, and whether that is a comment to drop
+        open_end = None
+        in_comment = False
+        # Python: a docstring may follow at the module start or after a def/class header
+        expect_docstring = docstrings
+        in_header = False
+        depth = 0
+        # Indentation of a removed def/class docstring while it is not known yet
+        # whether more statements follow it in the block, and the lines held back
+        docstring_indent = None
+        held = []
+        # (delimiter, indented) of the here-documents that start after the current line
+        heredocs = []
+        license_headers = self.license_headers
+        if license_headers is not None and license_headers.is_referenced(path):
+            header, lines = split_header(lines, SYNTAX[language])
+            yield from header
+
+        for number, line in enumerate(lines):
+            if number == 0 and line.startswith("#!"):
+                yield line
+                continue
+            if heredocs:
+                # Here-document text is data, whatever it looks like
+                yield line
+                delimiter, indented = heredocs[0]
+                text = line.rstrip("\n")
+                if re.match(r"\s*" + re.escape(delimiter) + r"\b", text) if indented else text == delimiter:
+                    heredocs.pop(0)
+                continue
+            if license_headers is not None and open_end is None and line.startswith(LICENSE_MARKER):
+                # Neither code nor comment: keep it, and a docstring may still follow
+                yield line
+                continue
+            if open_end is not None and in_comment and not line.strip():
+                continue
+            body = line[:-1] if line.endswith("\n") else line
+            newline = line[len(body):]
+            parts = []
+            removed = False
+            pos = 0
+            length = len(body)
+            while pos < length:
+                if open_end is not None:
+                    if in_comment:
+                        end = body.find(open_end, pos)
+                        removed = True
+                        if end == -1:
+                            pos = length
+                            break
+                        pos = end + len(open_end)
+                        if not "".join(parts).strip():
+                            # The comment opened the line: keep its indentation, not the gap
+                            if docstrings:
+                                # Python has no block comments, so this ended a docstring
+                                parts = [docstring_indent or ""]
+                                if body.startswith(";", pos):
+                                    pos += 1
+                            while pos < length and body[pos] in " \t":
+                                pos += 1
+                    else:
+                        end = -1
+                        for match in scanner.string_end[open_end].finditer(body, pos):
+                            if match.group() == open_end:
+                                end = match.end()
+                                break
+                        if end == -1:
+                            parts.append(body[pos:])
+                            pos = length
+                            break
+                        parts.append(body[pos:end])
+                        pos = end
+                    open_end = None
+                    continue
+                match = token_re.search(body, pos) if token_re is not None else None
+                if match is None:
+                    parts.append(body[pos:])
+                    break
+                parts.append(body[pos:match.start()])
+                token = match.group()
+                kind, end = scanner.tokens[token]
+                pos = match.end()
+                if kind == "heredoc":
+                    heredoc = scanner.heredoc_re.match(body, pos)
+                    if heredoc is not None:
+                        # <<- and <<~ allow an indented terminator, and so does PHP
+                        heredocs.append((heredoc.group(3), token != "<<" or heredoc.group(1) != ""))
+                        token += heredoc.group()
+                        pos = heredoc.end()
+                    parts.append(token)
+                    continue
+                if kind == "url":
+                    literal = URL_BODY_RE.match(body, pos)
+                    if literal is not None:
+                        token += literal.group()
+                        pos = literal.end()
+                    parts.append(token)
+                    continue
+                if kind == "regex":
+                    # A "/" after a value divides; elsewhere it starts a regex literal
+                    literal = REGEX_BODY_RE.match(body, pos) if REGEX_PRECEDER_RE.search("".join(parts)) else None
+                    if literal is not None:
+                        token += literal.group()
+                        pos = literal.end()
+                    parts.append(token)
+                    continue
+                if kind == "string" and expect_docstring and token in ('"""', "'''"):
+                    prefix = "".join(parts).strip()
+                    if prefix in DOCSTRING_PREFIXES:
+                        # Keep the indentation for code after the docstring on the same line
+                        parts = [body[:len(body) - len(body.lstrip())]]
+                        docstring_indent = parts[0] or None
+                        kind = "docstring"
+                        expect_docstring = False
+                if kind == "string":
+                    parts.append(token)
+                    open_end, in_comment = end, False
+                elif kind == "docstring":
+                    removed = True
+                    open_end, in_comment = token, True
+                elif not comments:
+                    # Docstrings only: the line is written unchanged unless a docstring went
+                    pos = length
+                elif kind == "block":
+                    removed = True
+                    open_end, in_comment = end, True
+                else:
+                    removed = True
+                    pos = length
+            # Strings in these languages cannot span lines without an escape
+            if open_end is not None and not in_comment and open_end not in scanner.multiline:
+                open_end = None
+
+            code = "".join(parts)
+            output = line
+            if removed:
+                code = code.rstrip()
+                if not code.strip():
+                    continue
+                output = code + newline
+            if docstring_indent is not None:
+                if not output.strip() or output.lstrip().startswith("#"):
+                    # Not a statement; the next line tells whether the block goes on
+                    held.append(output)
+                    continue
+                if len(output) - len(output.lstrip()) < len(docstring_indent):
+                    # The docstring was the only statement: the block needs another one
+                    yield docstring_indent + "...\n"
+                docstring_indent = None
+                yield from held
+                held = []
+            yield output
+
+            if docstrings and open_end is None:
+                stripped = code.strip()
+                if not stripped:
+                    continue
+                if not in_header and stripped.startswith(("def ", "class ", "async def ")):
+                    in_header = True
+                    depth = 0
+                if in_header:
+                    depth += sum(map(stripped.count, "([{")) - sum(map(stripped.count, ")]}"))
+                    if depth <= 0:
+                        expect_docstring = stripped.endswith(":")
+                        in_header = False
+                else:
+                    expect_docstring = False
+        if docstring_indent is not None:
+            yield docstring_indent + "...\n"
+        yield from held
+
+
+class CollapseBlankLines:
+    """Shrinks runs of blank lines to at most one blank line."""
+    name = "collapse_blank_lines"
+
+    def settings(self):
+        return {}
+
+    def applies(self, path):
+        return True
+
+    def context(self, path):
+        return None
+
+    def __call__(self, lines, path):
+        blank = False
+        for line in lines:
+            if line.strip():
+                blank = False
+                yield line
+            elif not blank:
+                blank = True
+                yield "\n"
+
+
+def split_header(lines, syntax):
+    """Returns (header_lines, rest_iterator) for the comment block at the start of a file.
+
+    The header is the first run of comment lines (or one block comment),
+    after a "#!" line and leading blank lines; it ends at the first blank line
+    or line of code.
+    """
+    lines = iter(lines)
+    header = []
+    line_tokens = tuple(syntax["line"])
+    block_end = None
+    started = False
+    for line in lines:
+        stripped = line.strip()
+        if block_end is not None:
+            header.append(line)
+            if block_end in stripped:
+                block_end = None
+            continue
+        if not header and stripped.startswith("#!"):
+            header.append(line)
+            continue
+        if not stripped:
+            if not started:
+                header.append(line)
+                continue
+            return header, _chain([line], lines)
+        if line_tokens and stripped.startswith(line_tokens):
+            started = True
+            header.append(line)
+            continue
+        block = next((pair for pair in syntax["block"] if stripped.startswith(pair[0])), None)
+        if block is not None and not started:
+            started = True
+            header.append(line)
+            if block[1] not in stripped[len(block[0]):]:
+                block_end = block[1]
+            continue
+        return header, _chain([line], lines)
+    return header, iter(())
+
+
+def _chain(first, rest):
+    yield from first
+    yield from rest
+
+
+def _header_digest(header_lines):
+    """Digest of the comment part of a header (no "#!" line, no blank lines), or None if it is no license."""
+    text = "".join(line.rstrip() + "\n" for line in header_lines if line.strip() and not line.startswith("#!"))
+    if not LICENSE_RE.search(text):
+        return None
+    return hashlib.sha1(text.encode('utf-8')).hexdigest()
+
+
+class LicenseHeaders:
+    """Replaces a license header that an earlier file of the output already showed.
+
+    The first file with a given header keeps it; in later files it becomes one
+    line naming that file. prepare() reads the start of every file in output
+    order, so the result does not depend on the order files are read in.
+    """
+    name = "license_headers"
+    # Headers that do not end within this many bytes are left alone
+    HEAD_BYTES = 16384
+
+    def __init__(self):
+        self.repeated = {}
+        self.referenced = set()
+
+    def settings(self):
+        return {}
+
+    def applies(self, path):
+        return language_of(path) is not None
+
+    def context(self, path):
+        return self.repeated.get(os.path.normpath(path))
+
+    def is_referenced(self, path):
+        """True if later files point to the header of path."""
+        return os.path.normpath(path) in self.referenced
+
+    def prepare(self, collector, files):
+        """Finds the files whose header repeats one of an earlier file."""
+        candidates = [item[0] for item in files
+                      if language_of(item[0]) is not None and item[0] not in collector._duplicates]
+        if collector.jobs <= 1:
+            digests = map(self._digest, candidates, [collector] * len(candidates))
+        else:
+            from concurrent.futures import ThreadPoolExecutor
+            with ThreadPoolExecutor(max_workers=collector.jobs) as pool:
+                digests = list(pool.map(self._digest, candidates, [collector] * len(candidates)))
+        first_seen = {}
+        self.repeated = {}
+        for file_path, digest in zip(candidates, digests):
+            if digest is None:
+                continue
+            path = os.path.normpath(file_path)
+            original = first_seen.setdefault(digest, path)
+            if original != path:
+                self.repeated[path] = original
+        self.referenced = set(self.repeated.values())
+
+    def _digest(self, file_path, collector):
+        """Digest of the license header of file_path, or None if it has none."""
+        try:
+            with open(file_path, 'rb') as f:
+                head = f.read(self.HEAD_BYTES)
+        except OSError:
+            return None
+        header, rest = split_header(iter_lines([collector._decode(head)]), SYNTAX[language_of(file_path)])
+        # The header must end within the head, or it is not known in full
+        if next(rest, None) is None and len(head) == self.HEAD_BYTES:
+            return None
+        return _header_digest(header)
+
+    def __call__(self, lines, path):
+        original = self.repeated.get(os.path.normpath(path))
+        if original is None:
+            yield from lines
+            return
+        header, rest = split_header(lines, SYNTAX[language_of(path)])
+        if _header_digest(header) is None:
+            # Changed since prepare(); leave it as it is
+            yield from header
+        else:
+            if header and header[0].startswith("#!"):
+                yield header[0]
+            yield f"{LICENSE_MARKER}{original} -----\n"
+        yield from rest
+
+
+def parse_ranges(spec):
+    """Parses "1-40,100-120,300-" into [(1, 40), (100, 120), (300, None)] (1-based, inclusive)."""
+    ranges = []
+    for part in str(spec).split(","):
+        part = part.strip()
+        if not part:
+            continue
+        start, sep, end = part.partition("-")
+        start = int(start)
+        end = (int(end) if end.strip() else None) if sep else start
+        if start < 1 or (end is not None and end < start):
+            raise ValueError(f"Invalid line range: {part}")
+        ranges.append((start, end))
+    return sorted(ranges)
+
+
+class LineRanges:
+    """Keeps only the given line ranges of matching files, e.g. {"src/tables.py": "1-40"}.
+
+    Keys are matched like include patterns, against the file name and the path
+    relative to the root. Left-out lines become a marker line.
+    """
+    name = "line_ranges"
+
+    def __init__(self, ranges, root_dir='.'):
+        self.specs = {pattern: str(spec) for pattern, spec in ranges.items()}
+        self.ranges = {pattern: parse_ranges(spec) for pattern, spec in self.specs.items()}
+        self.root_dir = root_dir
+
+    def settings(self):
+        return self.specs
+
+    def _pattern(self, path):
+        relative_path = os.path.relpath(path, self.root_dir).replace(os.sep, "/")
+        name = os.path.basename(path)
+        for pattern in sorted(self.ranges):
+            if fnmatch.fnmatch(name, pattern) or fnmatch.fnmatch(relative_path, pattern):
+                return pattern
+        return None
+
+    def applies(self, path):
+        return self._pattern(path) is not None
+
+    def context(self, path):
+        pattern = self._pattern(path)
+        return None if pattern is None else self.specs[pattern]
+
+    def __call__(self, lines, path):
+        ranges = self.ranges[self._pattern(path)]
+        skipped_from = None
+        number = 0
+        for number, line in enumerate(lines, 1):
+            if any(start <= number and (end is None or number <= end) for start, end in ranges):
+                if skipped_from is not None:
+                    yield f"... [lines {skipped_from}-{number - 1} omitted] ...\n"
+                    skipped_from = None
+                yield line
+            elif skipped_from is None:
+                skipped_from = number
+        if skipped_from is not None:
+            yield f"... [lines {skipped_from}-{number} omitted] ...\n"
+
+
+class TransformPipeline:
+    """Runs each file's decoded lines through a list of transforms, in order.
+
+    A transform is any object with a name, settings() (JSON-able), applies(path),
+    context(path) and __call__(lines, path) yielding the new lines; it may also
+    have prepare(collector, files), which runs once per plan. context() returns
+    per-file state that changes the output besides the file content (None if
+    there is none); it is part of the cache key and of the manifest.
+    """
+    # Config key -> transform; the order here is the order they run in
+    NAMES = ("license_headers", "strip_comments", "strip_docstrings", "collapse_blank_lines")
+
+    def __init__(self, transforms=()):
+        self.transforms = list(transforms)
+
+    @classmethod
+    def from_config(cls, config, root_dir='.'):
+        """Builds the pipeline from the "transforms" and "line_ranges" config keys."""
+        names = config.get("transforms", [])
+        unknown = sorted(set(names) - set(cls.NAMES))
+        if unknown:
+            raise ValueError(f"Unknown transforms: {', '.join(unknown)} (known: {', '.join(cls.NAMES)})")
+        transforms = []
+        if config.get("line_ranges"):
+            transforms.append(LineRanges(config["line_ranges"], root_dir))
+        license_headers = None
+        if "license_headers" in names:
+            license_headers = LicenseHeaders()
+            transforms.append(license_headers)
+        if "strip_comments" in names or "strip_docstrings" in names:
+            transforms.append(StripComments(comments="strip_comments" in names,
+                                            docstrings="strip_docstrings" in names,
+                                            license_headers=license_headers))
+        if "collapse_blank_lines" in names:
+            transforms.append(CollapseBlankLines())
+        return cls(transforms)
+
+    def __bool__(self):
+        return bool(self.transforms)
+
+    @property
+    def contextual(self):
+        """True if a file's output can depend on other files (so a change is not local)."""
+        return any(hasattr(transform, "prepare") for transform in self.transforms)
+
+    def settings(self):
+        return [[transform.name, transform.settings()] for transform in self.transforms]
+
+    def for_path(self, path):
+        """Returns the transforms that apply to path (an empty list if none)."""
+        return [transform for transform in self.transforms if transform.applies(path)]
+
+    def prepare(self, collector, files):
+        for transform in self.transforms:
+            if hasattr(transform, "prepare"):
+                transform.prepare(collector, files)
+
+    def context(self, path):
+        """Per-file state of all transforms, or None if no transform has any."""
+        contexts = {transform.name: transform.context(path) for transform in self.transforms}
+        contexts = {name: value for name, value in contexts.items() if value is not None}
+        return json.dumps(contexts, sort_keys=True) if contexts else None
+
+    def key(self, path, transforms):
+        """Everything besides the content that decides the transformed text of path."""
+        return json.dumps([TRANSFORM_VERSION] + [[transform.name, transform.settings(), transform.context(path)]
+                                                 for transform in transforms], sort_keys=True)
+
+    @staticmethod
+    def run(lines, path, transforms):
+        for transform in transforms:
+            lines = transform(lines, path)
+        return lines
+
+
+class TransformCache:
+    """Transformed file contents, keyed by content hash and transform settings.
+
+    Each entry is one file under the cache directory. Entries that were not
+    used by a run are removed by prune() at its end.
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+        self._used = set()
+        self._created = False
+
+    def key(self, content_hash, settings):
+        return hashlib.sha1(f"{content_hash}\0{settings}".encode('utf-8')).hexdigest()
+
+    def get(self, key):
+        self._used.add(key)
+        try:
+            with open(os.path.join(self.directory, key), 'rb') as f:
+                return f.read()
+        except OSError:
+            return None
+
+    def put(self, key, data):
+        self._used.add(key)
+        path = os.path.join(self.directory, key)
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        try:
+            if not self._created:
+                os.makedirs(self.directory, exist_ok=True)
+                self._created = True
+            with open(tmp_path, 'wb') as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except OSError:
+            # A cache that cannot be written only costs time
+            pass
+
+    def prune(self):
+        """Removes the entries this run did not use."""
+        if not self._used:
+            return
+        try:
+            with os.scandir(self.directory) as it:
+                stale = [entry.path for entry in it if entry.name not in self._used]
+        except OSError:
+            return
+        for path in stale:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
@@ -0,0 +1,346 @@
+import ctypes
+import ctypes.util
+import json
+import os
+import secrets
+import select
+import signal
+import socket
+import socketserver
+import struct
+import sys
+import threading
+import time
+
+# inotify(7) event bits
+IN_MODIFY = 0x00000002
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ISDIR = 0x40000000
+
+# Events after which the file list or the tree shape may have changed
+STRUCTURAL_EVENTS = (IN_CREATE | IN_DELETE | IN_MOVED_FROM | IN_MOVED_TO | IN_DELETE_SELF
+                     | IN_MOVE_SELF | IN_Q_OVERFLOW | IN_ISDIR)
+
+
+class InotifyWatcher:
+    """Minimal ctypes binding for Linux inotify, one watch per directory."""
+    MASK = IN_MODIFY | IN_CLOSE_WRITE | (STRUCTURAL_EVENTS & ~(IN_Q_OVERFLOW | IN_ISDIR))
+    _EVENT = struct.Struct("iIII")
+
+    def __init__(self, libc, fd):
+        self._libc = libc
+        self.fd = fd
+        self._paths = {}
+        self._watched = set()
+
+    @classmethod
+    def create(cls):
+        """Returns a watcher, or None where inotify is not available."""
+        if not sys.platform.startswith("linux"):
+            return None
+        try:
+            libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+            libc.inotify_init1.argtypes = [ctypes.c_int]
+            libc.inotify_add_watch.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+        except (OSError, AttributeError):
+            return None
+        fd = libc.inotify_init1(os.O_CLOEXEC)
+        if fd < 0:
+            return None
+        return cls(libc, fd)
+
+    def add(self, path):
+        if path in self._watched:
+            return
+        wd = self._libc.inotify_add_watch(self.fd, os.fsencode(path), self.MASK)
+        if wd < 0:
+            errno = ctypes.get_errno()
+            raise OSError(errno, os.strerror(errno), path)
+        self._paths[wd] = path
+        self._watched.add(path)
+
+    def read_events(self, timeout):
+        """Returns [(path, mask)], waiting up to timeout seconds (None = forever)."""
+        ready, _, _ = select.select([self.fd], [], [], timeout)
+        if not ready:
+            return []
+        data = os.read(self.fd, 256 * 1024)
+        events = []
+        offset = 0
+        while offset < len(data):
+            wd, mask, _, length = self._EVENT.unpack_from(data, offset)
+            name = data[offset + self._EVENT.size:offset + self._EVENT.size + length].rstrip(b"\0")
+            offset += self._EVENT.size + length
+            if mask & IN_IGNORED:
+                self._watched.discard(self._paths.pop(wd, None))
+                continue
+            if mask & IN_Q_OVERFLOW:
+                events.append(("", mask))
+                continue
+            base = self._paths.get(wd)
+            if base is not None:
+                events.append((os.path.join(base, os.fsdecode(name)) if name else base, mask))
+        return events
+
+    def close(self):
+        os.close(self.fd)
+
+
+class _SnapshotHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        self.request.settimeout(5)
+        token = self.rfile.readline(256).strip()
+        if not secrets.compare_digest(token, self.server.token):
+            return
+        tree, blocks = self.server.daemon.snapshot
+        self.wfile.write(tree)
+        for block in blocks:
+            self.wfile.write(block)
+
+
+class _SnapshotServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+
+
+class WatchDaemon:
+    """Keeps the output file up to date and serves it to `4gpt --from-daemon`.
+
+    All file blocks are kept in memory. When only emitted files were modified,
+    just their blocks and tree lines are replaced; anything else (new, deleted
+    or renamed paths) triggers a stat-only rescan that still reuses the blocks
+    of unchanged files.
+    """
+    POLL_INTERVAL = 1.0
+
+    def __init__(self, collector, debounce=0.3, use_polling=False):
+        self.collector = collector
+        self.debounce = debounce
+        self.use_polling = use_polling
+        self.info_path = os.path.join(collector.cache_dir, "daemon.json")
+        self.snapshot = (b"", ())
+        self._exclude = collector._get_matchers()[1]
+        self._own_files = {os.path.abspath(collector.output_file + ".tmp")}
+        self._blocks = {}
+        self._files = []
+        self._tree_lines = []
+        self._tree_index = {}
+        self._scan_started_ns = 0
+
+    def refresh(self):
+        """Rescans the tree and re-reads new or changed files. Returns the number of files read."""
+        c = self.collector
+        scan_started_ns = time.time_ns()
+        c.rescan()
+        tree_lines, files = c._get_plan()
+        tree_index = c._get_scan()[2]
+
+        blocks = {}
+        read = 0
+        for item in files:
+            record = c._record(item)
+            key = os.path.normpath(record.path)
+            old = self._blocks.get(key)
+            # Same mtime tick as the previous scan: the file may have changed again unseen
+            state = (record.size, record.mtime_ns, record.same_as, record.transform_context)
+            if old is not None and old[:4] == state and record.mtime_ns < self._scan_started_ns:
+                blocks[key] = old
+                continue
+            if record.content_hash is not None:
+                blocks[key] = state + (record.content_hash, record.block)
+                read += 1
+        self._scan_started_ns = scan_started_ns
+
+        changed = read or blocks.keys() != self._blocks.keys() or tree_lines != self._tree_lines
+        self._blocks = blocks
+        self._files = [item for item in files if os.path.normpath(item[0]) in blocks]
+        self._tree_lines = list(tree_lines)
+        self._tree_index = tree_index
+        if changed:
+            self._publish()
+        return read if changed else None
+
+    def patch(self, paths):
+        """Re-reads modified files in place; falls back to refresh() if the change is not local."""
+        c = self.collector
+        positions = {os.path.normpath(item[0]): index for index, item in enumerate(self._files)}
+        # Budget packing, dedup and some transforms depend on other files as well
+        contextual = c.max_tokens is not None or c.dedup or (c.transforms and c.transforms.contextual)
+        if contextual or not paths or any(key not in positions for key in paths):
+            return self.refresh()
+        for key in paths:
+            index = positions[key]
+            file_path, old_size, _ = self._files[index]
+            try:
+                st = os.stat(file_path)
+            except OSError:
+                return self.refresh()
+            if c.skip_detected and c._get_sniffer().verdict(file_path, st.st_size, st.st_mtime_ns) in c.skip_detected:
+                return self.refresh()
+            block, content_hash = c._read_block(file_path, st.st_size)
+            if content_hash is None:
+                return self.refresh()
+            self._files[index] = (file_path, st.st_size, st.st_mtime_ns)
+            self._blocks[key] = (st.st_size, st.st_mtime_ns, None, c._transform_context(file_path), content_hash, block)
+
+            line_no = self._tree_index[file_path]
+            line = self._tree_lines[line_no]
+            old_label = f"({c._format_size(old_size)})"
+            pos = line.rfind(old_label)
+            if pos != -1:
+                self._tree_lines[line_no] = f"{line[:pos]}({c._format_size(st.st_size)}){line[pos + len(old_label):]}"
+        self._publish()
+        return len(paths)
+
+    def _publish(self):
+        """Writes the output file and its block index, so `4gpt extract` and --incremental can use them."""
+        c = self.collector
+        tree = c._tree_text(self._tree_lines).encode('utf-8')
+        entries = [(os.path.normpath(item[0]), self._blocks[os.path.normpath(item[0])]) for item in self._files]
+        self.snapshot = (tree, tuple(entry[-1] for _, entry in entries))
+        manifest_files = {}
+        offset = len(tree)
+        for key, (size, mtime_ns, same_as, transform_context, content_hash, block) in entries:
+            manifest_files[key] = {
+                "mtime_ns": mtime_ns,
+                "size": size,
+                "hash": content_hash,
+                "offset": offset,
+                "length": len(block),
+                "same_as": os.path.normpath(same_as) if same_as else None,
+                "transform": transform_context,
+            }
+            offset += len(block)
+        tmp_path = c.output_file + ".tmp"
+        try:
+            with open(tmp_path, 'wb') as f:
+                f.write(tree)
+                for block in self.snapshot[1]:
+                    f.write(block)
+            os.replace(tmp_path, c.output_file)
+        except OSError as e:
+            print(f"Error writing to output file {c.output_file}: {e}")
+            return
+        c._write_manifest(manifest_files)
+
+    def _ignored(self, path):
+        if not path:
+            return False
+        if os.path.abspath(path) in self._own_files:
+            return True
+        relative_path = os.path.relpath(path, self.collector.root_dir).replace(os.sep, '/')
+        return self._exclude.matches(os.path.basename(path), relative_path)
+
+    def _start_server(self):
+        server = _SnapshotServer(("127.0.0.1", 0), _SnapshotHandler)
+        server.daemon = self
+        server.token = secrets.token_hex(16).encode('ascii')
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+
+        os.makedirs(self.collector.cache_dir, exist_ok=True)
+        info = {"pid": os.getpid(), "port": server.server_address[1], "token": server.token.decode('ascii')}
+        fd = os.open(self.info_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump(info, f)
+        return server
+
+    def _watch_dirs(self, watcher):
+        try:
+            for dir_path in self.collector.scanned_dirs:
+                watcher.add(dir_path)
+            return True
+        except OSError as e:
+            print(f"Cannot watch {e.filename} ({e.strerror}); switching to polling.")
+            return False
+
+    def serve_forever(self):
+        c = self.collector
+        start = time.perf_counter()
+        self.refresh()
+        print(f"Initial run: {len(self._files)} files in {time.perf_counter() - start:.2f} s.")
+
+        watcher = None if self.use_polling else InotifyWatcher.create()
+        if watcher is not None and not self._watch_dirs(watcher):
+            watcher.close()
+            watcher = None
+        server = self._start_server()
+        mode = "inotify" if watcher is not None else f"polling every {self.POLL_INTERVAL:g} s"
+        print(f"Watching {os.path.abspath(c.root_dir)} ({mode}); output: {c.output_file}. "
+              f"Clients: 4gpt --from-daemon [-c]. Press Ctrl+C to stop.")
+        # Let `kill` stop the daemon through the same cleanup as Ctrl+C
+        signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+        try:
+            if watcher is not None:
+                self._inotify_loop(watcher)
+                # A new directory could not be watched; poll from here on
+                watcher.close()
+                watcher = None
+            while True:
+                time.sleep(self.POLL_INTERVAL)
+                self._report(self.refresh())
+        except KeyboardInterrupt:
+            print("\nStopping watch.")
+        finally:
+            server.shutdown()
+            server.server_close()
+            if watcher is not None:
+                watcher.close()
+            try:
+                os.remove(self.info_path)
+            except OSError:
+                pass
+
+    def _inotify_loop(self, watcher):
+        """Applies changes as inotify reports them; returns when a directory cannot be watched."""
+        modified = set()
+        structural = False
+        last_event = None
+        while True:
+            timeout = None if last_event is None else max(0.0, last_event + self.debounce - time.monotonic())
+            events = watcher.read_events(timeout)
+            for path, mask in events:
+                if self._ignored(path):
+                    continue
+                if mask & STRUCTURAL_EVENTS:
+                    structural = True
+                else:
+                    modified.add(os.path.normpath(path))
+                last_event = time.monotonic()
+            if events or last_event is None or time.monotonic() < last_event + self.debounce:
+                continue
+
+            if structural:
+                self._report(self.refresh())
+                if not self._watch_dirs(watcher):
+                    return
+            else:
+                self._report(self.patch(modified))
+            modified = set()
+            structural = False
+            last_event = None
+
+    def _report(self, files_read):
+        if files_read is not None:
+            print(f"{time.strftime('%H:%M:%S')} Updated {self.collector.output_file}: "
+                  f"{files_read} files re-read, {len(self._files)} files total.")
+
+
+def connect_to_daemon(cache_dir):
+    """Returns a binary stream with the daemon's current output, or None if no daemon answers."""
+    try:
+        with open(os.path.join(cache_dir, "daemon.json"), 'r', encoding='utf-8') as f:
+            info = json.load(f)
+        sock = socket.create_connection(("127.0.0.1", info["port"]), timeout=5)
+    except (OSError, ValueError, KeyError):
+        return None
+    sock.sendall(info["token"].encode('ascii') + b"\n")
+    stream = sock.makefile('rb')
+    sock.close()  # the file object keeps the connection open
+    return stream
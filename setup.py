@@ -11,9 +11,7 @@ setup(
     package_data={
         'forgpt': ['config.json'],  # Specify that config.json is included in the twogpt package
     },
-    install_requires=[
-        'dir-tree @ git+https://github.com/krausality/dir_tree.git@v0.2.0',
-    ],
+    install_requires=[],
     entry_points={
         'console_scripts': [
             '4gpt=forgpt.core:main',  # Adds `4gpt` command to the CLI
@@ -0,0 +1,13 @@
+/*
+ * File header
+ */
+#include <stdio.h>
+
+// line comment
+int main(void) {
+    const char *s = "/* not a comment */ // nor this";
+    char c = '/';  /* a slash */
+    printf("%s%c\n", s, c); // print it
+    return 0;  /* multi
+                  line */
+}
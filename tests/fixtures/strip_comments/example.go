@@ -0,0 +1,12 @@
+// Package main is an example.
+package main
+
+import "fmt"
+
+/* block
+   comment */
+func main() {
+	s := `raw // not a comment
+/* nor this */`
+	fmt.Println(s, "//") // print
+}
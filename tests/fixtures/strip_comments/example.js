@@ -0,0 +1,10 @@
+// Module comment
+const url = "http://example.com";  // a URL in a string
+const re = /https?:\/\/[^/]+/g;  // a regex literal with slashes
+const half = total / 2;  // division
+const ratio = (a / b) / c;
+if (/\/\//.test(url)) console.log(`template // not a comment`);
+/* block */ const x = 1;
+function f() {
+  return /[/]/.test(x);  // slash in a character class
+}
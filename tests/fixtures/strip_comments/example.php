@@ -0,0 +1,17 @@
+<?php
+// line comment
+# hash comment
+#[Attribute(Attribute::TARGET_CLASS)]
+class Route
+{
+    /* block */
+    public function __construct(public string $path = "/#home") {} // ctor
+}
+
+$text = <<<EOT
+    # kept: inside a heredoc
+    // kept as well
+    EOT;
+$nowdoc = <<<'EOT'
+# kept
+EOT;
@@ -0,0 +1,6 @@
+<#
+    Block comment
+#>
+$name = "World"  # greeting target
+Write-Host "Hello # $name"
+<# inline #> Write-Host 'done'
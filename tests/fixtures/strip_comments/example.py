@@ -0,0 +1,17 @@
+#!/usr/bin/env python3
+# Module comment
+import re  # trailing comment
+
+URL = "http://example.com/#anchor"  # the '#' in the string stays
+PATTERN = re.compile(r"#\d+")
+
+
+def f(x):
+    """Docstrings stay unless strip_docstrings is on."""
+    # a comment line inside a function
+    return x * 2  # doubled
+
+
+TEXT = """
+# not a comment, part of the string
+"""
@@ -0,0 +1,9 @@
+# R: <<- assigns in the enclosing environment
+counter <- function() {
+  count <- 0
+  function() {
+    count <<- count + 1  # superassignment, not a here-document
+    # dropped
+    paste("# not a comment", count)
+  }
+}
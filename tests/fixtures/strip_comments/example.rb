@@ -0,0 +1,12 @@
+# Ruby: << appends unless a here-document identifier follows it directly
+def greet(name, list)
+  puts "Hello, #{name}"  # interpolation is not a comment
+  list << name  # appended, not a here-document
+  text = <<~TEXT
+    # kept: inside a squiggly heredoc
+  TEXT
+  raw = <<-'RAW'
+    # kept as well
+    RAW
+  text + raw  # dropped
+end
@@ -0,0 +1,14 @@
+#!/bin/sh
+# Setup script
+set -e  # stop on errors
+
+echo "# not a comment" '# nor this'
+echo ${#HOME} $#  # parameter lengths, not comments
+cat <<EOF2 > config.ini
+# kept: part of the here-document
+key=value
+EOF2
+cat <<-'END'
+	# kept as well
+	END
+echo $((1 << 2))  # a shift, not a here-document
@@ -0,0 +1,8 @@
+-- Report query
+SELECT id, name -- the columns
+FROM users /* all users */
+WHERE name <> '-- not a comment'
+  AND note = "/* nor this */";
+/*
+ * trailing block
+ */
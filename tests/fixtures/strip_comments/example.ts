@@ -0,0 +1,6 @@
+/** Doc comment */
+export function parse(input: string): string[] {
+  // split on slashes
+  return input.split(/\//);  // regex after a call paren
+}
+const n: number = 10 / 5; // division
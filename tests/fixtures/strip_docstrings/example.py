@@ -0,0 +1,44 @@
+"""Module docstring.
+
+Spans several lines.
+"""
+import os  # comment
+
+
+class Config:
+    '''Class docstring.'''
+
+    name = """not a docstring: an assignment"""
+
+    def load(self,
+             path,
+             default=None):
+        r"""Raw docstring after a multi-line signature."""
+        return os.path.exists(path)  # checked
+
+
+async def fetch(url):
+    """One-liner."""; return url
+
+
+def keep():
+    value = 1
+    """A string after the first statement is not a docstring."""
+    return value
+
+
+class Err(Exception):
+    """Only a docstring: the class keeps a body."""
+
+
+def stub():
+    """Only a docstring,
+    over two lines."""
+    # a comment is no statement
+
+
+class Outer:
+    """Docstring, then a method."""
+
+    def method(self):
+        '''Only a docstring.'''
@@ -0,0 +1,87 @@
+import glob
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from forgpt.transforms import LICENSE_MARKER, StripComments, TransformPipeline, iter_lines
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+
+
+def fixtures(directory):
+    directory = os.path.join(FIXTURES, directory)
+    return sorted(path[:-len(".expected")] for path in glob.glob(os.path.join(directory, "*.expected")))
+
+
+def read(path):
+    with open(path, 'r', encoding='utf-8', newline='') as f:
+        return f.read()
+
+
+def strip(transform, path, text):
+    return "".join(transform(iter_lines([text]), path))
+
+
+# One before/after pair per language the lexer knows (tests/fixtures/*/<name> and <name>.expected)
+@pytest.mark.parametrize("path", fixtures("strip_comments"), ids=os.path.basename)
+def test_strip_comments(path):
+    assert strip(StripComments(), path, read(path)) == read(path + ".expected")
+
+
+@pytest.mark.parametrize("path", fixtures("strip_docstrings"), ids=os.path.basename)
+def test_strip_docstrings(path):
+    assert strip(StripComments(comments=True, docstrings=True), path, read(path)) == read(path + ".expected")
+
+
+def test_strip_docstrings_only_keeps_comments():
+    text = '"""Module."""\nx = 1  # kept\n'
+    assert strip(StripComments(comments=False, docstrings=True), "m.py", text) == "x = 1  # kept\n"
+
+
+def test_docstring_only_body_keeps_a_statement():
+    text = 'def f():\n    """Doc."""\n    # kept\n\nx = 1\n'
+    expected = 'def f():\n    ...\n    # kept\n\nx = 1\n'
+    assert strip(StripComments(comments=False, docstrings=True), "m.py", text) == expected
+
+
+class FakeCollector:
+    jobs = 1
+    _duplicates = set()
+
+    @staticmethod
+    def _decode(data):
+        return data.decode('utf-8')
+
+
+HEADER = "# Copyright (c) 2024 Example\n# SPDX-License-Identifier: MIT\n"
+
+
+def run_pipeline(tmp_path, names, files):
+    paths = []
+    for name, text in files.items():
+        path = tmp_path / name
+        path.write_text(text, encoding='utf-8')
+        paths.append(str(path))
+    pipeline = TransformPipeline.from_config({"transforms": names})
+    pipeline.prepare(FakeCollector(), [(path, os.path.getsize(path)) for path in paths])
+    return [strip(lambda lines, p: pipeline.run(lines, p, pipeline.for_path(p)), path, read(path)) for path in paths]
+
+
+def test_license_header_kept_when_referenced(tmp_path):
+    first, second = run_pipeline(tmp_path, ["license_headers", "strip_comments", "strip_docstrings"], {
+        "a.py": HEADER + '"""Docstring a."""\n# comment\nA = 1\n',
+        "b.py": HEADER + '"""Docstring b."""\nB = 2\n',
+    })
+    # The header b.py points to stays; the rest of a.py is stripped as usual
+    assert first == HEADER + "A = 1\n"
+    # The marker is kept and does not keep the docstring after it from being stripped
+    assert second.startswith(LICENSE_MARKER) and str(tmp_path / "a.py") in second
+    assert second.endswith(" -----\nB = 2\n")
+
+
+def test_unreferenced_license_header_is_stripped(tmp_path):
+    (only,) = run_pipeline(tmp_path, ["license_headers", "strip_comments"], {"a.py": HEADER + "A = 1\n"})
+    assert only == "A = 1\n"